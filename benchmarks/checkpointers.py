@@ -0,0 +1,223 @@
+"""
+Checkpoint backend benchmark.
+
+Runs the same conformance checks against every checkpoint saver (the stock
+single-connection SQLite saver, the pooled SQLite saver and the MongoDB
+saver), then measures turn throughput with N conversations checkpointing at
+once: each turn loads its thread, writes a checkpoint and its pending writes.
+MongoDB runs on the in-memory stand-in unless `--mongo-uri` points at a real
+server (a scratch database is used and dropped).
+
+    python -m benchmarks.checkpointers --concurrency 1 8 32
+    python -m benchmarks.checkpointers --mongo-uri mongodb://localhost:27017
+"""
+
+from contextlib import asynccontextmanager
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DB_URI", "mongodb://offline.invalid:27017")
+
+from langgraph.checkpoint.base import empty_checkpoint
+from pymongo import AsyncMongoClient
+
+from benchmarks.fakes import InMemoryDatabase
+from utils.checkpoint_maintenance import CheckpointMaintainer, TimedAsyncSqliteSaver
+from utils.checkpointer import AsyncMongoSaver, PooledAsyncSqliteSaver
+from utils.metrics import percentile
+
+
+# ✅ --- Backends ---
+@asynccontextmanager
+async def stock_sqlite(directory: str):
+    import aiosqlite
+
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.sqlite")
+    conn = await aiosqlite.connect(path)
+    saver = TimedAsyncSqliteSaver(conn)
+    await saver.setup()
+    # Same pragmas as the service
+    await CheckpointMaintainer(saver, path).configure()
+    try:
+        yield saver
+    finally:
+        await conn.close()
+
+
+@asynccontextmanager
+async def pooled_sqlite(directory: str):
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.sqlite")
+    saver = await PooledAsyncSqliteSaver.connect(path)
+    await saver.setup()
+    await CheckpointMaintainer(saver, path).configure()
+    try:
+        yield saver
+    finally:
+        await saver.aclose()
+
+
+def mongo(uri: str = None):
+    @asynccontextmanager
+    async def open_saver(directory: str):
+        client = AsyncMongoClient(uri, serverSelectionTimeoutMS=5000) if uri else None
+        name = f"checkpoint_bench_{uuid.uuid4().hex[:8]}"
+        saver = AsyncMongoSaver(client[name] if client else InMemoryDatabase())
+        await saver.setup()
+        try:
+            yield saver
+        finally:
+            if client:
+                await client.drop_database(name)
+                await client.close()
+
+    return open_saver
+
+
+# ✅ --- Conformance ---
+def _config(thread_id: str, checkpoint_id: str = None, ns: str = "") -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ns}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+async def _put(saver, thread_id: str, parent: dict = None, ns: str = "", **metadata) -> dict:
+    config = parent or _config(thread_id, ns=ns)
+    return await saver.aput(config, empty_checkpoint(), metadata, {})
+
+
+async def check_conformance(saver) -> list:
+    """Returns the failed checks; an empty list means the saver behaves like the stock one."""
+    failures = []
+
+    def expect(label: str, ok: bool):
+        if not ok:
+            failures.append(label)
+
+    thread = uuid.uuid4().hex
+    first = await _put(saver, thread, source="input", step=-1)
+    second = await _put(saver, thread, first, source="loop", step=0)
+    third = await _put(saver, thread, second, source="loop", step=1)
+    await _put(saver, thread, ns="child", source="loop", step=0)
+    await _put(saver, uuid.uuid4().hex, source="input", step=-1)
+
+    latest = await saver.aget_tuple(_config(thread))
+    expect("latest checkpoint", latest and latest.config == third)
+    expect("parent config", latest and latest.parent_config == second)
+    expect("metadata", latest and latest.metadata.get("step") == 1)
+    by_id = await saver.aget_tuple(first)
+    expect("checkpoint by id", by_id and by_id.config == first and by_id.parent_config is None)
+    expect("missing thread", await saver.aget_tuple(_config(uuid.uuid4().hex)) is None)
+    child = await saver.aget_tuple(_config(thread, ns="child"))
+    expect("namespace isolation", child and child.metadata.get("step") == 0)
+
+    listed = [t.config for t in [t async for t in saver.alist(_config(thread))]]
+    expect("list newest first", listed[:3] == [third, second, first])
+    limited = [t async for t in saver.alist(_config(thread), limit=1)]
+    expect("list limit", [t.config for t in limited] == [third])
+    before = [t.config async for t in saver.alist(_config(thread), before=second)]
+    expect("list before", first in before and second not in before and third not in before)
+    filtered = [t async for t in saver.alist(_config(thread), filter={"source": "input"})]
+    expect("list metadata filter", [t.config for t in filtered] == [first])
+
+    # Regular writes are kept once, special channels are overwritten
+    await saver.aput_writes(third, [("messages", "a"), ("answer", 1)], "task-b")
+    await saver.aput_writes(third, [("messages", "ignored")], "task-b")
+    await saver.aput_writes(third, [("messages", "z")], "task-a")
+    await saver.aput_writes(third, [("__error__", "first")], "task-c")
+    await saver.aput_writes(third, [("__error__", "second")], "task-c")
+    writes = (await saver.aget_tuple(_config(thread))).pending_writes
+    expect(
+        "pending writes",
+        writes == [
+            ("task-a", "messages", "z"),
+            ("task-b", "messages", "a"),
+            ("task-b", "answer", 1),
+            ("task-c", "__error__", "second"),
+        ],
+    )
+    listed_writes = [t async for t in saver.alist(_config(thread), limit=1)][0].pending_writes
+    expect("pending writes in list", listed_writes == writes)
+
+    await saver.adelete_thread(thread)
+    expect("delete thread", await saver.aget_tuple(_config(thread)) is None)
+    return failures
+
+
+# ✅ --- Throughput ---
+async def _conversation(saver, turns: int, latencies: list):
+    thread = uuid.uuid4().hex
+    config = _config(thread)
+    for step in range(turns):
+        start = time.perf_counter()
+        await saver.aget_tuple(_config(thread))
+        latencies.append(time.perf_counter() - start)
+        config = await saver.aput(config, empty_checkpoint(), {"source": "loop", "step": step}, {})
+        await saver.aput_writes(config, [("messages", f"turn {step}")], uuid.uuid4().hex)
+
+
+async def measure(saver, concurrency: int, turns: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_conversation(saver, turns, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "turns_per_s": concurrency * turns / elapsed,
+        "get_p50_ms": percentile(latencies, 0.5) * 1000,
+        "get_p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+async def main(args) -> int:
+    backends = {
+        "sqlite (stock)": stock_sqlite,
+        "sqlite (pooled)": pooled_sqlite,
+        "mongo" + ("" if args.mongo_uri else " (in-memory)"): mongo(args.mongo_uri),
+    }
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        print("conformance")
+        for name, open_saver in backends.items():
+            async with open_saver(directory) as saver:
+                failures = await check_conformance(saver)
+            failed |= bool(failures)
+            print(f"  {name:<22}{'ok' if not failures else 'FAIL ' + ', '.join(failures)}")
+
+        # Two workers sharing one checkpoint file see each other's turns
+        path = os.path.join(directory, "shared.sqlite")
+        first = await PooledAsyncSqliteSaver.connect(path)
+        second = await PooledAsyncSqliteSaver.connect(path)
+        await first.setup()
+        written = await _put(first, "shared", source="input", step=-1)
+        shared = await second.aget_tuple(_config("shared"))
+        await first.aclose()
+        await second.aclose()
+        failed |= not (shared and shared.config == written)
+        print(f"  {'sqlite shared file':<22}{'ok' if shared and shared.config == written else 'FAIL'}")
+
+        header = f"{'backend':<24}{'conversations':>14}{'turns/s':>10}{'get p50 ms':>12}{'get p95 ms':>12}"
+        print(f"\nthroughput, {args.turns} turns per conversation")
+        print(header)
+        print("-" * len(header))
+        for name, open_saver in backends.items():
+            for concurrency in args.concurrency:
+                async with open_saver(directory) as saver:
+                    stats = await measure(saver, concurrency, args.turns)
+                print(
+                    f"{name:<24}{concurrency:>14}{stats['turns_per_s']:>10.0f}"
+                    f"{stats['get_p50_ms']:>12.2f}{stats['get_p95_ms']:>12.2f}"
+                )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--mongo-uri", help="benchmark a real MongoDB server instead of the stand-in")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,120 @@
+"""
+Query plan check.
+
+Runs every data-layer operation once against the in-memory database and
+records the filters, projections and sorts they send, so the checked
+queries are always the service's own. Then creates the managed indexes in
+a scratch database on the MongoDB server at DB_URI, explains each recorded
+query and exits with status 1 if any would scan the whole collection
+(COLLSCAN). The scratch database is dropped afterwards.
+
+    DB_URI=mongodb://localhost:27017 python -m benchmarks.explain
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import os
+import sys
+
+# Collections whose reads are allowed to scan: the portfolio is read whole
+SCANNED_COLLECTIONS = ("users", "projects")
+
+
+async def record_hot_queries(database) -> list:
+    """
+    Exercises booking, verification, rescheduling, cancellation, hold reaping,
+    slot lookups and the outbox on `database` (an InMemoryDatabase already
+    behind config.db). Returns (caller, collection, recorded query) tuples.
+    """
+    from utils import database_operations as ops
+    from utils.outbox import outbox
+
+    for collection in database.collections.values():
+        collection.queries.clear()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    slot = today + timedelta(days=3, hours=10)
+    ann, bob = "ann@example.com", "bob@example.com"
+
+    otp = await ops.book_meeting("Ann", ann, "A project", slot)
+    await ops.verify_meeting(ann, 1000 if otp != 1000 else 1001)
+    await ops.verify_meeting(ann, otp)
+    await ops.find_client(ann)
+    await ops.reschedule(ann, slot + timedelta(hours=4))
+    await ops.book_meeting("Bob", bob, "Another project", slot + timedelta(days=1))
+    await ops.delete_unverified_meeting(bob)
+    await ops.reclaim_expired_holds()
+    ops.slot_index._loaded_at = None
+    await ops.get_alternative_slots()
+    # Beyond the slot index's horizon, so it asks the database directly
+    await ops.is_slot_available(today + timedelta(days=365, hours=10))
+    await ops.find_free_slots(today, today + timedelta(days=14))
+    await ops.calendar_version()
+    # Only the outbox's due-message query, nothing is sent
+    for message in database["outbox"].docs:
+        message["next_attempt_at"] = datetime.utcnow() + timedelta(days=1)
+    await outbox.process_batch()
+
+    return [
+        (query["caller"], collection.name, query)
+        for collection in database.collections.values()
+        if collection.name not in SCANNED_COLLECTIONS
+        for query in collection.queries
+    ]
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def explain_queries(uri: str, queries: list, database_name: str = "explain_check") -> list:
+    """Explains each recorded query on a scratch database. Returns (caller, plan stages)."""
+    from pymongo import AsyncMongoClient
+
+    from utils.indexes import ensure_indexes
+
+    client = AsyncMongoClient(uri, serverSelectionTimeoutMS=5000)
+    database = client[database_name]
+    results = []
+    try:
+        await ensure_indexes(database)
+        for caller, collection, query in queries:
+            command = {"find": collection, "filter": query["filter"]}
+            if query["projection"]:
+                command["projection"] = query["projection"]
+            if query["sort"]:
+                command["sort"] = dict(query["sort"])
+            explained = await database.command("explain", command, verbosity="queryPlanner")
+            stages = [s for s in _stages(explained["queryPlanner"]["winningPlan"]) if s]
+            results.append((caller, stages))
+    finally:
+        await client.drop_database(database_name)
+        await client.close()
+    return results
+
+
+async def main(args) -> int:
+    os.environ.setdefault("SMTP_USER", "assistant@example.com")
+    from benchmarks.fakes import InMemoryDatabase
+    from config.db import db
+
+    database = InMemoryDatabase()
+    db.attach(database)
+    queries = await record_hot_queries(database)
+    failures = 0
+    for caller, stages in await explain_queries(os.environ["DB_URI"], queries, args.database):
+        scan = "COLLSCAN" in stages
+        failures += scan
+        print(f"{'FAIL' if scan else 'ok':<6}{caller:<45}{' > '.join(stages)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", default="explain_check")
+    sys.exit(asyncio.run(main(parser.parse_args())))
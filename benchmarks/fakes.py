@@ -0,0 +1,456 @@
+"""
+Offline stand-ins used by the benchmark suite: an in-memory MongoDB database
+and a local SMTP sink. They don't import LangChain, so the startup benchmark
+can use them without warming its imports.
+"""
+
+from bson import ObjectId
+from copy import deepcopy
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from types import SimpleNamespace
+import asyncio
+import os
+import sys
+
+from utils.metrics import record_mongo_command
+
+
+# ✅ --- In-Memory MongoDB ---
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None, False
+        value = value[part]
+    return value, True
+
+
+def _matches_condition(value, present: bool, condition) -> bool:
+    if not isinstance(condition, dict) or not any(k.startswith("$") for k in condition):
+        return present and value == condition
+    for op, arg in condition.items():
+        if op == "$exists":
+            ok = present == bool(arg)
+        elif op == "$in":
+            ok = present and value in arg
+        elif op == "$nin":
+            ok = not present or value not in arg
+        elif op == "$ne":
+            ok = not present or value != arg
+        elif op == "$eq":
+            ok = present and value == arg
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not present or value is None:
+                return False
+            ok = {
+                "$gt": value > arg,
+                "$gte": value >= arg,
+                "$lt": value < arg,
+                "$lte": value <= arg,
+            }[op]
+        else:
+            raise NotImplementedError(f"Unsupported query operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        else:
+            value, present = _get(doc, key)
+            if not _matches_condition(value, present, condition):
+                return False
+    return True
+
+
+def project(doc: dict, projection) -> dict:
+    if not projection:
+        return deepcopy(doc)
+    include_id = projection.get("_id", 1)
+    fields = {k.split(".")[0] for k, v in projection.items() if v and k != "_id"}
+    if fields:
+        result = {k: deepcopy(v) for k, v in doc.items() if k in fields}
+    else:
+        excluded = {k for k, v in projection.items() if not v}
+        result = {k: deepcopy(v) for k, v in doc.items() if k not in excluded}
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                doc[key] = deepcopy(value)
+            elif op == "$inc":
+                doc[key] = doc.get(key, 0) + value
+            elif op == "$unset":
+                doc.pop(key, None)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"Unsupported update operator {op}")
+
+
+def _sorted(docs: list, sort) -> list:
+    if not sort:
+        return docs
+    if isinstance(sort, str):
+        sort = [(sort, 1)]
+    for key, direction in reversed(sort):
+        docs = sorted(
+            docs,
+            key=lambda d: (_get(d, key)[0] is None, _get(d, key)[0]),
+            reverse=direction < 0,
+        )
+    return docs
+
+
+def _caller() -> str:
+    """The innermost service function on the stack, e.g. "database_operations.verify_meeting"."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.sep + "utils" + os.sep in filename and "site-packages" not in filename:
+            module = os.path.splitext(os.path.basename(filename))[0]
+            return f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class InMemoryCursor:
+    def __init__(self, docs: list, projection, recorded: dict = None):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+        self._recorded = recorded
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else key
+        if self._recorded is not None:
+            self._recorded["sort"] = self._sort
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self):
+        docs = _sorted(self._docs, self._sort)
+        if self._limit:
+            docs = docs[: self._limit]
+        return [project(d, self._projection) for d in docs]
+
+    async def to_list(self, length=None):
+        return self._results()
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self._results():
+                yield doc
+
+        return iterate()
+
+
+class InMemoryCollection:
+    """
+    The subset of the async pymongo collection API the service uses. Unique
+    (and partial unique) indexes are enforced, every call is atomic.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = []
+        self.indexes = []
+        self.calls = 0
+        # Every filter the service sent, for checking query plans on a real server
+        self.queries = []
+
+    def _command(self, query=None, projection=None, sort=None):
+        # One round trip, seen by the same per-task counter the Mongo listener feeds
+        self.calls += 1
+        record_mongo_command()
+        if query is None:
+            return None
+        recorded = {
+            "caller": _caller(),
+            "filter": deepcopy(query),
+            "projection": projection,
+            "sort": [(sort, 1)] if isinstance(sort, str) else sort,
+        }
+        self.queries.append(recorded)
+        return recorded
+
+    def _find(self, query):
+        return [d for d in self.docs if matches(d, query)]
+
+    def _check_unique(self, candidate: dict, replacing: dict = None):
+        for index in self.indexes:
+            if not index.get("unique"):
+                continue
+            partial = index.get("partialFilterExpression")
+            if partial and not matches(candidate, partial):
+                continue
+            fields = list(index["key"])
+            key = [_get(candidate, f)[0] for f in fields]
+            for doc in self.docs:
+                if doc is replacing or (partial and not matches(doc, partial)):
+                    continue
+                if [_get(doc, f)[0] for f in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {index['name']}")
+
+    def _update(self, doc: dict, update: dict):
+        updated = deepcopy(doc)
+        _apply_update(updated, update)
+        self._check_unique(updated, replacing=doc)
+        doc.clear()
+        doc.update(updated)
+
+    def find(self, query=None, projection=None):
+        recorded = self._command(query or {}, projection)
+        return InMemoryCursor(self._find(query), projection, recorded)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self._command(query or {}, projection, sort)
+        docs = _sorted(self._find(query), sort)
+        return project(docs[0], projection) if docs else None
+
+    async def count_documents(self, query):
+        self._command(query)
+        return len(self._find(query))
+
+    async def insert_one(self, doc: dict):
+        self._command()
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self.docs.append(deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self._command(query)
+        docs = self._find(query)
+        if docs:
+            self._update(docs[0], update)
+            return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = self._upsert(query, update)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def _upsert(self, query, update):
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        _apply_update(doc, update, inserting=True)
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc
+
+    async def find_one_and_update(
+        self,
+        query,
+        update,
+        projection=None,
+        sort=None,
+        upsert=False,
+        return_document=ReturnDocument.BEFORE,
+    ):
+        self._command(query, projection, sort)
+        docs = _sorted(self._find(query), sort)
+        if not docs:
+            if upsert:
+                doc = self._upsert(query, update)
+                if return_document == ReturnDocument.AFTER:
+                    return project(doc, projection)
+            return None
+        before = project(docs[0], projection)
+        self._update(docs[0], update)
+        if return_document == ReturnDocument.AFTER:
+            return project(docs[0], projection)
+        return before
+
+    async def find_one_and_delete(self, query, projection=None, sort=None):
+        self._command(query, projection, sort)
+        docs = _sorted(self._find(query), sort)
+        if not docs:
+            return None
+        self.docs.remove(docs[0])
+        return project(docs[0], projection)
+
+    async def delete_one(self, query):
+        self._command(query)
+        docs = self._find(query)
+        if docs:
+            self.docs.remove(docs[0])
+        return SimpleNamespace(deleted_count=len(docs[:1]))
+
+    async def delete_many(self, query):
+        self._command(query)
+        docs = self._find(query)
+        self.docs = [d for d in self.docs if d not in docs]
+        return SimpleNamespace(deleted_count=len(docs))
+
+    async def bulk_write(self, requests, ordered=True):
+        # Only the UpdateOne upserts the Mongo checkpoint saver sends; counts as one round trip
+        self._command()
+        upserted = 0
+        for request in requests:
+            docs = self._find(request._filter)
+            if docs:
+                self._update(docs[0], request._doc)
+            elif request._upsert:
+                self._upsert(request._filter, request._doc)
+                upserted += 1
+        return SimpleNamespace(upserted_count=upserted)
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", str(keys))
+
+    async def create_indexes(self, models):
+        documents = [m.document for m in models]
+        for document in documents:
+            # Like the server, an index on keys that hold duplicates can't be built
+            self._check_existing_unique(document)
+        names = {d["name"] for d in documents}
+        self.indexes = [i for i in self.indexes if i["name"] not in names] + documents
+        return [d["name"] for d in documents]
+
+    def _check_existing_unique(self, index: dict):
+        if not index.get("unique"):
+            return
+        partial = index.get("partialFilterExpression")
+        seen = set()
+        for doc in self.docs:
+            if partial and not matches(doc, partial):
+                continue
+            key = repr([_get(doc, f)[0] for f in index["key"]])
+            if key in seen:
+                raise OperationFailure(
+                    f"Index build failed: E11000 duplicate key error index: {index['name']}",
+                    code=11000,
+                )
+            seen.add(key)
+
+    async def list_indexes(self):
+        names = ["_id_", *(index["name"] for index in self.indexes)]
+        return InMemoryCursor([{"name": n} for n in names], None)
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = InMemoryCollection(name)
+        return self.collections[name]
+
+    async def watch(self, *args, **kwargs):
+        raise NotImplementedError("Change streams are not available in memory")
+
+    def total_calls(self) -> int:
+        return sum(c.calls for c in self.collections.values())
+
+
+# ✅ --- Seed Data and Requests ---
+def seed(database: InMemoryDatabase, projects: int = 12, busy_days: int = 5):
+    """A portfolio owner, some projects, and a fully booked first few days."""
+    database["users"].docs.append(
+        {
+            "name": "Aryan Baghel",
+            "title": "Full Stack Developer",
+            "description": "Builds AI products end to end.",
+            "stack": [{"description": d} for d in ("Python", "FastAPI", "React", "MongoDB")],
+        }
+    )
+    for i in range(projects):
+        database["projects"].docs.append(
+            {"title": f"Project {i}", "description": f"Description of project {i}. " * 4}
+        )
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in range(1, busy_days + 1):
+        for hour in (10, 14, 16):
+            database["meetings"].docs.append(
+                {
+                    "client_name": "Busy Client",
+                    "client_email": f"busy{day}{hour}@example.com",
+                    "client_project_description": "Existing booking",
+                    "date": today + timedelta(days=day, hours=hour),
+                    "isCompleted": False,
+                    "isVerified": True,
+                }
+            )
+
+
+class FakeRequest:
+    """Just enough of a Starlette request for the chat controller."""
+
+    def __init__(self, state):
+        self.app = SimpleNamespace(state=state)
+
+    async def is_disconnected(self):
+        return False
+
+
+# ✅ --- Local SMTP Sink ---
+class SMTPSink:
+    """A minimal plain-text SMTP server that accepts and keeps every message."""
+
+    def __init__(self):
+        self.messages = []
+        self.port = None
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        writer.write(b"220 sink ESMTP\r\n")
+        recipients = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith("EHLO"):
+                    writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+                elif command.startswith("RCPT"):
+                    recipients.append(command)
+                    writer.write(b"250 OK\r\n")
+                elif command == "DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    body = []
+                    while (data := await reader.readline()) not in (b".\r\n", b""):
+                        body.append(data)
+                    self.messages.append((recipients, b"".join(body)))
+                    recipients = []
+                    writer.write(b"250 OK\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                elif command.split(" ")[0] in ("HELO", "MAIL", "RSET", "NOOP"):
+                    writer.write(b"250 OK\r\n")
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+                await writer.drain()
+        finally:
+            writer.close()
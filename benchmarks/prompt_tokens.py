@@ -0,0 +1,114 @@
+"""
+Prompt size benchmark.
+
+Builds synthetic portfolios of growing size and compares the system prompt
+the agent sends per turn (fixed summary plus the top-k retrieved entries)
+with the previous prompt that listed every project. Also reports how long
+the index takes to build and search, and how often the top hit for a
+question naming a domain and a technology is a project with both.
+
+    python -m benchmarks.prompt_tokens --projects 5 25 100 500 2000
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("DB_URI", "mongodb://offline.invalid:27017")
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+
+from langchain_core.messages import SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from utils.metrics import percentile
+from utils.project_index import PROJECT_TOP_K, ProjectIndex, format_relevant_projects
+from utils.workflow import get_system_prompt
+
+DOMAINS = [
+    "clinic booking", "food delivery", "crypto wallet", "real estate listing",
+    "fitness tracker", "online learning", "inventory management", "travel planner",
+    "music streaming", "job board", "expense splitter", "weather dashboard",
+]
+TECHS = [
+    "React", "Next.js", "FastAPI", "Django", "Node.js", "MongoDB", "PostgreSQL",
+    "Redis", "LangGraph", "Flutter", "TypeScript", "Docker",
+]
+STACK = ["Python", "FastAPI", "React", "Next.js", "MongoDB", "LangChain", "Docker", "AWS"]
+
+
+def portfolio(size: int, rng: random.Random):
+    user = {
+        "name": "Aryan Baghel",
+        "title": "Full Stack Developer",
+        "description": "Builds AI products end to end.",
+        "stack": [{"description": s} for s in STACK],
+    }
+    projects = []
+    for i in range(size):
+        domain, tech, other = rng.choice(DOMAINS), rng.choice(TECHS), rng.choice(TECHS)
+        projects.append(
+            {
+                "title": f"{domain.title()} App {i}",
+                "description": (
+                    f"A {domain} platform built with {tech} and {other}. It handles "
+                    f"authentication, payments and realtime updates, and was deployed "
+                    f"for a client with a focus on performance and accessibility."
+                ),
+            }
+        )
+    return user, projects
+
+
+def legacy_prompt(user, projects) -> str:
+    """The previous prompt: every project inlined (stack and instructions are comparable)."""
+    listing = "\n".join(f"- {p['title']}: {p['description']}" for p in projects)
+    return get_system_prompt(user, projects) + "\n" + listing
+
+
+def tokens(text: str) -> int:
+    return count_tokens_approximately([SystemMessage(content=text)])
+
+
+def main(args):
+    rng = random.Random(7)
+    header = (
+        f"{'projects':>9}{'all tokens':>12}{'top-k tokens':>14}{'build ms':>10}"
+        f"{'search us':>11}{'top-1 hit':>10}"
+    )
+    print(f"top-k = {PROJECT_TOP_K}, {args.queries} targeted questions per size")
+    print(header)
+    print("-" * len(header))
+    for size in args.projects:
+        user, projects = portfolio(size, rng)
+        start = time.perf_counter()
+        index = ProjectIndex.from_portfolio(user, projects)
+        build = time.perf_counter() - start
+        base = get_system_prompt(user, projects)
+
+        largest, hits, asked, searches = 0, 0, 0, []
+        for _ in range(args.queries):
+            domain, tech = rng.choice(DOMAINS), rng.choice(TECHS)
+            question = f"Has he built a {domain} app with {tech}?"
+            start = time.perf_counter()
+            found = index.search(question)
+            searches.append(time.perf_counter() - start)
+            # Only count questions the portfolio can answer
+            if any(domain in p["description"] and tech in p["description"] for p in projects):
+                asked += 1
+                top = found[0]["description"] if found else ""
+                hits += domain in top and tech in top
+            largest = max(largest, tokens(base + format_relevant_projects(found)))
+        print(
+            f"{size:>9}{tokens(legacy_prompt(user, projects)):>12}{largest:>14}"
+            f"{build * 1000:>10.1f}{percentile(searches, 0.5) * 1e6:>11.0f}"
+            f"{hits / max(asked, 1):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, nargs="+", default=[5, 25, 100, 500, 2000])
+    parser.add_argument("--queries", type=int, default=50)
+    main(parser.parse_args())
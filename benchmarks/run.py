@@ -0,0 +1,471 @@
+"""
+Offline benchmark suite.
+
+Runs the booking flow end to end through `get_app` and a set of
+microbenchmarks, with a scripted chat model in place of Gemini, an
+in-memory database behind `config.db.MongoDB` and a local SMTP sink.
+Nothing leaves the machine.
+
+    python -m benchmarks.run                        # print p50/p95 latencies
+    python -m benchmarks.run --save baseline.json   # keep the results
+    python -m benchmarks.run --compare baseline.json
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.fakes import FakeRequest, InMemoryDatabase, SMTPSink, seed
+from benchmarks.scripted_model import ScriptedChatModel, tool_call
+from utils.metrics import percentile
+
+
+def _configure_offline_env(smtp_port: int):
+    os.environ.setdefault("DB_URI", "mongodb://offline.invalid:27017")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(smtp_port)
+    os.environ["SMTP_USER"] = "assistant@example.com"
+    os.environ["SMTP_PASS"] = ""
+    os.environ["SMTP_STARTTLS"] = "false"
+    os.environ["OUTBOX_POLL_INTERVAL_SECONDS"] = "0.05"
+
+    # Email deliverability checks need DNS
+    import email_validator
+
+    email_validator.CHECK_DELIVERABILITY = False
+
+
+def _last_tool_result(messages, name: str) -> dict:
+    for message in reversed(messages):
+        if getattr(message, "name", None) == name and message.type == "tool":
+            return json.loads(message.content)
+    return {}
+
+
+def booking_script(email: str, slot: datetime, new_slot: datetime) -> list:
+    """
+    Model steps for onboarding, slot check, booking and rescheduling. The OTP
+    replies are answered by the fast path router, so they have no steps.
+    """
+    name, project = "Jane Tester", "A booking assistant for a clinic"
+
+    def check_slot(messages):
+        resolved = _last_tool_result(messages, "resolve_datetime")
+        return tool_call("check_slot_availability", datetime_str=resolved["datetime_str"])
+
+    return [
+        tool_call("lookup_client", client_email=email),
+        AIMessage(content="Thanks! What's your full name?"),
+        AIMessage(content="Great. Could you tell me a bit about your project?"),
+        AIMessage(content="When would you like to meet?"),
+        tool_call("resolve_datetime", expression=slot.strftime("%Y-%m-%d %H:%M")),
+        check_slot,
+        AIMessage(content="Good news! That time is available. Shall I book it?"),
+        tool_call(
+            "book_meeting",
+            client_name=name,
+            client_email=email,
+            client_project_description=project,
+            datetime_str=slot.isoformat(),
+        ),
+        AIMessage(content="I've sent a verification code to your email."),
+        tool_call("reschedule", client_email=email, datetime_str=new_slot.isoformat()),
+        AIMessage(content="Done, your meeting has been rescheduled."),
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds * 1000)
+
+    def summary(self) -> dict:
+        result = {}
+        for name, values in self.samples.items():
+            result[name] = {
+                "n": len(values),
+                "p50_ms": round(percentile(values, 0.5), 3),
+                "p95_ms": round(percentile(values, 0.95), 3),
+            }
+        return result
+
+
+async def bench_booking_flow(recorder, chat_app, database, workflow, iterations: int):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    otp_turns, otp_model_calls, confirmed = 0, 0, 0
+    for i in range(iterations):
+        replies = []
+        email = f"client{i}-{uuid.uuid4().hex[:6]}@example.com"
+        slot = today + timedelta(days=10 + i, hours=14)
+        new_slot = slot + timedelta(hours=2)
+        workflow.llm = ScriptedChatModel(script=booking_script(email, slot, new_slot))
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+        def otp():
+            meeting = next(
+                m for m in database["meetings"].docs
+                if m["client_email"] == email and not m.get("isVerified")
+            )
+            return str(meeting["OTP"])
+
+        turns = [
+            ("onboarding", lambda: f"Hi, I'd like to book a meeting. My email is {email}"),
+            ("details", lambda: "Jane Tester"),
+            ("details", lambda: "A booking assistant for a clinic"),
+            ("slot_check", lambda: slot.strftime("%Y-%m-%d %H:%M")),
+            ("book", lambda: "Yes, please book it"),
+            ("verify", lambda: "0000"),  # Codes are 4 digits from 1000, so never valid
+            ("verify", otp),
+            ("reschedule", lambda: "Can we move it two hours later?"),
+        ]
+        flow_start = time.perf_counter()
+        for name, message in turns:
+            start = time.perf_counter()
+            calls = workflow.llm.position
+            result = await chat_app.ainvoke(
+                {"messages": [HumanMessage(content=message())]}, config
+            )
+            recorder.add(f"flow.{name}", time.perf_counter() - start)
+            if name == "verify":
+                otp_turns += 1
+                otp_model_calls += workflow.llm.position - calls
+                replies.append(result["messages"][-1].content)
+        recorder.add("flow.total", time.perf_counter() - flow_start)
+        confirmed += any(r.startswith("You're all set") for r in replies[-1:])
+    # Without the fast path every OTP reply cost a tool-call step and a phrasing step
+    print(
+        f"otp replies: {otp_turns} turns, {otp_model_calls} model calls "
+        f"({otp_turns * 2} without the fast path), {confirmed}/{iterations} confirmed"
+    )
+
+
+async def bench_tool_memo(recorder, chat_app, database, workflow, iterations: int):
+    """
+    A turn in which the model repeats its client lookup and slot check, books,
+    then checks the slot again, run with and without the per-run tool memo.
+    The slot is past the slot index horizon, so every check reads MongoDB.
+    """
+    from utils.tool_memo import ToolMemo
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    db_calls = {False: 0, True: 0}
+    saved, stale = 0, 0
+    for i in range(iterations):
+        for memoized in (False, True):
+            email = f"memo{i}-{uuid.uuid4().hex[:6]}@example.com"
+            slot = (today + timedelta(days=300 + i, hours=14 if memoized else 10)).isoformat()
+            workflow.llm = ScriptedChatModel(
+                script=[
+                    tool_call("lookup_client", client_email=email),
+                    tool_call("check_slot_availability", datetime_str=slot),
+                    tool_call("lookup_client", client_email=email),
+                    tool_call("check_slot_availability", datetime_str=slot),
+                    tool_call(
+                        "book_meeting",
+                        client_name="Memo Tester",
+                        client_email=email,
+                        client_project_description="A repeat visitor",
+                        datetime_str=slot,
+                    ),
+                    tool_call("check_slot_availability", datetime_str=slot),
+                    AIMessage(content="Booked, I've sent you a code."),
+                ]
+            )
+            memo = ToolMemo() if memoized else None
+            configurable = {"thread_id": str(uuid.uuid4())}
+            if memo is not None:
+                configurable["tool_memo"] = memo
+            before = database.total_calls()
+            start = time.perf_counter()
+            result = await chat_app.ainvoke(
+                {"messages": [HumanMessage(content=f"Book {slot} for {email}")]},
+                {"configurable": configurable},
+            )
+            recorder.add(f"tool_memo.{'on' if memoized else 'off'}", time.perf_counter() - start)
+            db_calls[memoized] += database.total_calls() - before
+            saved += memo.saved_db_calls if memo else 0
+            # The check after booking must not be answered from before the write
+            stale += _last_tool_result(result["messages"], "check_slot_availability").get(
+                "available", False
+            )
+    print(
+        f"tool memo: {db_calls[False]} database calls without, {db_calls[True]} with "
+        f"(reported saved: {saved}), {stale} stale slot checks after a booking"
+    )
+
+
+async def bench_alternative_slots(recorder, database_operations, iterations: int):
+    for _ in range(iterations):
+        database_operations.slot_index._loaded_at = None
+        start = time.perf_counter()
+        await database_operations.get_alternative_slots()
+        recorder.add("get_alternative_slots.cold", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await database_operations.get_alternative_slots()
+        recorder.add("get_alternative_slots.warm", time.perf_counter() - start)
+
+
+async def bench_system_prompt(recorder, database_operations, workflow, iterations: int):
+    user, projects = await database_operations.find_portfolio_data()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        workflow.get_system_prompt(user, projects)
+        recorder.add("get_system_prompt", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await workflow.portfolio_cache.refresh()
+        recorder.add("portfolio_cache.refresh", time.perf_counter() - start)
+
+
+async def bench_free_slots(recorder, database_operations, iterations: int):
+    """The slots endpoint's work: the change counter read, and the range query on a miss."""
+    start = datetime.utcnow()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        await database_operations.calendar_version()
+        recorder.add("slots.calendar_version", time.perf_counter() - t)
+
+        t = time.perf_counter()
+        slots = await database_operations.find_free_slots(start, start + timedelta(days=14))
+        recorder.add("slots.find_free_slots", time.perf_counter() - t)
+    print(
+        f"free slots in the next 14 days: {len(slots)}, "
+        f"calendar version after the booking benchmarks: {await database_operations.calendar_version()}"
+    )
+
+
+async def bench_sse_controller(recorder, runtime, workflow, iterations: int, burst: int):
+    from controllers.chat import stream_chat_response
+    from utils.admission import admission
+
+    answer = " ".join(f"word{i}" for i in range(200))
+    state = SimpleNamespace(runtime=runtime)
+
+    async def one_stream(question: str, label: str):
+        start = time.perf_counter()
+        first = None
+        frames = []
+        async for frame in stream_chat_response(FakeRequest(state), question, str(uuid.uuid4())):
+            if first is None:
+                first = time.perf_counter() - start
+            frames.append(frame)
+        recorder.add(f"{label}.ttfb", first)
+        recorder.add(f"{label}.total", time.perf_counter() - start)
+        return frames
+
+    workflow.llm = ScriptedChatModel(script=[AIMessage(content=answer)])
+    for i in range(iterations):
+        await one_stream(f"Tell me about project {i} ({uuid.uuid4().hex})", "sse")
+
+    # A burst of concurrent streams exercises admission control
+    workflow.llm = ScriptedChatModel(script=[AIMessage(content=answer)], token_delay=0.001)
+    results = await asyncio.gather(
+        *(one_stream(f"burst {i} {uuid.uuid4().hex}", "sse.burst") for i in range(burst))
+    )
+    busy = sum(any('"busy"' in f for f in frames) for frames in results)
+    print(f"burst of {burst} streams: {busy} answered busy, admission {admission.stats()}")
+
+
+async def bench_thread_turns(recorder, runtime, workflow, iterations: int, duplicates: int = 3):
+    """
+    Per iteration, sends `duplicates` copies of one message plus a follow-up to
+    the same thread at once. The copies should share one graph run and the
+    follow-up should run after it, seeing the first exchange.
+    """
+    from controllers.chat import stream_chat_response
+    from utils.thread_turns import thread_turns
+
+    state = SimpleNamespace(runtime=runtime)
+    chat_app = await runtime.get_chat_app()
+    workflow.llm = ScriptedChatModel(
+        script=[AIMessage(content=" ".join(f"word{i}" for i in range(50)))], token_delay=0.001
+    )
+
+    async def one_stream(question: str, thread_id: str, label: str):
+        start = time.perf_counter()
+        frames = [f async for f in stream_chat_response(FakeRequest(state), question, thread_id)]
+        recorder.add(label, time.perf_counter() - start)
+        return frames
+
+    model_calls = workflow.llm.position
+    shared, ordered = 0, 0
+    for _ in range(iterations):
+        thread_id, question = str(uuid.uuid4()), f"Tell me more ({uuid.uuid4().hex})"
+        follow_up = f"And then? ({uuid.uuid4().hex})"
+        results = await asyncio.gather(
+            *(one_stream(question, thread_id, "turns.duplicate") for _ in range(duplicates)),
+            one_stream(follow_up, thread_id, "turns.follow_up"),
+        )
+        shared += all(frames == results[0] for frames in results[:duplicates])
+        snapshot = await chat_app.aget_state({"configurable": {"thread_id": thread_id}})
+        contents = [m.content for m in snapshot.values["messages"] if m.type == "human"]
+        ordered += contents == [question, follow_up]
+    model_calls = workflow.llm.position - model_calls
+    print(
+        f"thread turns: {iterations * (duplicates + 1)} requests, {model_calls} model calls, "
+        f"{shared}/{iterations} duplicate groups shared one stream, "
+        f"{ordered}/{iterations} threads in order, {thread_turns.stats()}"
+    )
+
+
+async def bench_resume(recorder, runtime, workflow, iterations: int):
+    """
+    Drops each stream after a few events and reconnects with the last event
+    id. The answer should arrive complete and in order, from one model call.
+    """
+    from controllers.chat import stream_chat_response
+
+    state = SimpleNamespace(runtime=runtime)
+    answer = " ".join(f"word{i}" for i in range(100))
+    workflow.llm = ScriptedChatModel(script=[AIMessage(content=answer)], token_delay=0.002)
+
+    def text(frames):
+        payloads = [json.loads(f.split("data: ", 1)[1]) for f in frames if "data: " in f]
+        return "".join(p["data"] for p in payloads if p["event"] == "data")
+
+    model_calls = workflow.llm.position
+    complete = 0
+    for _ in range(iterations):
+        thread_id, question = str(uuid.uuid4()), f"Explain it ({uuid.uuid4().hex})"
+        first = []
+        stream = stream_chat_response(FakeRequest(state), question, thread_id)
+        async for frame in stream:
+            first.append(frame)
+            if len(first) == 3:
+                break
+        await stream.aclose()
+        last_event_id = first[-1].split("\n", 1)[0].removeprefix("id: ")
+
+        start = time.perf_counter()
+        rest = []
+        async for frame in stream_chat_response(
+            FakeRequest(state), question, thread_id, last_event_id
+        ):
+            if not rest:
+                recorder.add("resume.ttfb", time.perf_counter() - start)
+            rest.append(frame)
+        complete += text(first + rest).strip() == answer and '"end"' in rest[-1]
+    model_calls = workflow.llm.position - model_calls
+
+    expired = [f async for f in stream_chat_response(FakeRequest(state), "hi", "gone", "0.1")]
+    print(
+        f"resumed streams: {complete}/{iterations} complete after a drop, "
+        f"{model_calls} model calls, unknown id answered with "
+        f"{json.loads(expired[0].split('data: ', 1)[1])['event']}"
+    )
+
+
+def _blocking_lookup(seconds: float):
+    time.sleep(seconds)  # A sync call made straight from a coroutine
+
+
+async def bench_loop_watchdog(watchdog):
+    """Blocks the loop on purpose, then reports where the watchdog saw the suite stall."""
+    site = "run._blocking_lookup"
+    before = watchdog.sites[site]
+    _blocking_lookup(watchdog.threshold * 3)
+    await asyncio.sleep(watchdog.interval * 3)
+    others = [f"{name} x{count}" for name, count in watchdog.sites.most_common(5) if name != site]
+    print(
+        f"loop watchdog: deliberate block {'named' if watchdog.sites[site] > before else 'MISSED'}, "
+        f"{watchdog.stats()}, other blocking sites: {', '.join(others) or 'none'}"
+    )
+
+
+async def drain_outbox(outbox, database, timeout: float = 10):
+    deadline = time.perf_counter() + timeout
+    while database["outbox"].docs and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+
+def report(summary: dict, baseline: dict = None):
+    header = f"{'benchmark':<32}{'n':>5}{'p50 ms':>12}{'p95 ms':>12}"
+    if baseline:
+        header += f"{'base p50':>12}{'Δ p50':>9}{'base p95':>12}{'Δ p95':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in sorted(summary.items()):
+        line = f"{name:<32}{stats['n']:>5}{stats['p50_ms']:>12.3f}{stats['p95_ms']:>12.3f}"
+        base = (baseline or {}).get(name)
+        if base:
+            for key in ("p50_ms", "p95_ms"):
+                change = (stats[key] - base[key]) / base[key] * 100 if base[key] else 0.0
+                line += f"{base[key]:>12.3f}{change:>+8.1f}%"
+        print(line)
+
+
+async def main(args):
+    sink = SMTPSink()
+    await sink.start()
+    _configure_offline_env(sink.port)
+
+    database = InMemoryDatabase()
+    seed(database, projects=args.projects)
+    from config.db import db
+
+    db.attach(database)
+
+    from utils import database_operations, workflow
+    from utils.loop_watchdog import LoopWatchdog
+    from utils.outbox import outbox
+    from utils.runtime import Runtime
+
+    watchdog = LoopWatchdog(interval=0.01, threshold=args.lag_ms / 1000)
+    watchdog.start()
+    runtime = Runtime(":memory:")
+    await runtime.start()
+    chat_app = runtime.chat_app
+
+    recorder = Recorder()
+    try:
+        await bench_booking_flow(recorder, chat_app, database, workflow, args.iterations)
+        await bench_tool_memo(recorder, chat_app, database, workflow, args.iterations)
+        await bench_alternative_slots(recorder, database_operations, args.iterations * 5)
+        await bench_system_prompt(recorder, database_operations, workflow, args.iterations * 5)
+        await bench_free_slots(recorder, database_operations, args.iterations * 5)
+        await bench_sse_controller(recorder, runtime, workflow, args.iterations, args.burst)
+        await bench_thread_turns(recorder, runtime, workflow, args.iterations)
+        await bench_resume(recorder, runtime, workflow, args.iterations)
+        await drain_outbox(outbox, database)
+        await bench_loop_watchdog(watchdog)
+    finally:
+        await runtime.stop()
+        await watchdog.stop()
+        await sink.stop()
+
+    print(f"emails delivered to the SMTP sink: {len(sink.messages)}")
+    print(f"database operations issued: {database.total_calls()}")
+    summary = recorder.summary()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(summary, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=40)
+    parser.add_argument("--projects", type=int, default=12)
+    parser.add_argument("--lag-ms", type=float, default=50, help="loop watchdog threshold")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file written by --save")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,67 @@
+"""
+A deterministic stand-in for the Gemini chat model used by the benchmarks.
+"""
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import asyncio
+import json
+import uuid
+
+
+# ✅ --- Scripted Chat Model ---
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model. Each call returns the next step of `script`:
+    either an AIMessage or a callable that builds one from the messages.
+    Text replies are streamed word by word, tool calls as one chunk.
+    """
+
+    script: list = []
+    position: int = 0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _next(self, messages) -> AIMessage:
+        step = self.script[self.position % len(self.script)]
+        self.position += 1
+        return step(messages) if callable(step) else step
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._next(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._next(messages)
+        if message.tool_calls:
+            chunks = [
+                tool_call_chunk(
+                    name=call["name"],
+                    args=json.dumps(call["args"]),
+                    id=call["id"],
+                    index=i,
+                )
+                for i, call in enumerate(message.tool_calls)
+            ]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="", tool_call_chunks=chunks)
+            )
+            return
+        for word in message.content.split(" "):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+def tool_call(name: str, **args) -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}],
+    )
@@ -0,0 +1,129 @@
+"""
+Cold start benchmark.
+
+Each run starts a fresh interpreter and measures, for one startup mode:
+importing `main`, running the FastAPI lifespan startup (together, the time
+until the server accepts requests), and the first chat request up to its
+first streamed frame, sent `--request-delay-ms` after startup. Eager mode
+builds everything at startup (the previous behaviour); lazy mode defers it
+to the first request, optionally prewarming in the background.
+
+    python -m benchmarks.startup --runs 5
+"""
+
+from contextlib import aclosing
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+MODES = {
+    "eager": {"LAZY_INIT": "false"},
+    "lazy": {"LAZY_INIT": "true", "PREWARM": "false"},
+    "lazy+prewarm": {"LAZY_INIT": "true", "PREWARM": "true"},
+}
+
+
+async def _child():
+    os.environ.setdefault("DB_URI", "mongodb://offline.invalid:27017")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    os.environ.setdefault("SMTP_USER", "assistant@example.com")
+    os.environ["CHECKPOINT_PATH"] = ":memory:"
+
+    start = time.perf_counter()
+    import main
+
+    import_seconds = time.perf_counter() - start
+
+    # The in-memory stand-ins don't import LangChain, so they don't skew the lazy numbers
+    from benchmarks.fakes import FakeRequest, InMemoryDatabase, seed
+    from config.db import db
+
+    database = InMemoryDatabase()
+    seed(database, projects=12)
+    db.attach(database)
+
+    lifespan = main.app.router.lifespan_context(main.app)
+    start = time.perf_counter()
+    await lifespan.__aenter__()
+    startup_seconds = time.perf_counter() - start
+
+    from controllers.chat import stream_chat_response
+
+    await asyncio.sleep(float(os.environ["REQUEST_DELAY_MS"]) / 1000)
+    start = time.perf_counter()
+    await main.app.state.runtime.get_chat_app()
+    # Swap in the scripted model once the runtime exists, the real one needs the network
+    from benchmarks.scripted_model import ScriptedChatModel
+    from langchain_core.messages import AIMessage
+    from utils import workflow
+
+    workflow.llm = ScriptedChatModel(script=[AIMessage(content="Hello there!")])
+    request = FakeRequest(main.app.state)
+    async with aclosing(stream_chat_response(request, "Hi", "startup")) as frames:
+        async for frame in frames:
+            if "data:" in frame:
+                break
+    first_request_seconds = time.perf_counter() - start
+
+    await lifespan.__aexit__(None, None, None)
+    print(
+        json.dumps(
+            {
+                "import_ms": import_seconds * 1000,
+                "startup_ms": startup_seconds * 1000,
+                "first_request_ms": first_request_seconds * 1000,
+            }
+        )
+    )
+
+
+def _run_mode(env: dict, request_delay_ms: float) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        env={**os.environ, **env, "REQUEST_DELAY_MS": str(request_delay_ms)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    # Imported here so the timed child processes don't load it ahead of the app
+    from utils.metrics import percentile
+
+    results = {}
+    for mode, env in MODES.items():
+        runs = [_run_mode(env, args.request_delay_ms) for _ in range(args.runs)]
+        results[mode] = {key: percentile([r[key] for r in runs], 0.5) for key in runs[0]}
+
+    header = (
+        f"{'mode':<16}{'import ms':>12}{'startup ms':>12}{'ready ms':>12}{'first req ms':>14}"
+    )
+    print(f"median of {args.runs} cold starts per mode, first request sent "
+          f"{args.request_delay_ms:.0f} ms after startup")
+    print(header)
+    print("-" * len(header))
+    for mode, stats in results.items():
+        ready = stats["import_ms"] + stats["startup_ms"]
+        print(
+            f"{mode:<16}{stats['import_ms']:>12.1f}{stats['startup_ms']:>12.1f}"
+            f"{ready:>12.1f}{stats['first_request_ms']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--request-delay-ms", type=float, default=2000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(_child())
+    else:
+        main(args)
@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from pymongo.errors import (
     ConnectionFailure,
     ConfigurationError,
@@ -8,6 +8,7 @@ from fastapi import HTTPException
 import logging
 import os
 from dotenv import load_dotenv
+from utils.metrics import MongoCommandTimer
 
 load_dotenv()
 
@@ -15,17 +16,40 @@ logging.basicConfig(level=logging.INFO)
 
 
 class MongoDB:
-    def __init__(self, uri: str, db_name: str):
+    def __init__(self, uri: str, db_name: str, max_pool_size: int = 50):
         self.uri = uri
         self.db_name = db_name
+        self.max_pool_size = max_pool_size
         self.client = None
         self.db = None
 
-    def connect(self):
-        try:
-            self.client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
-            self.client.admin.command("ping")  # Force connection
+    def get_database(self):
+        """
+        Returns the async database handle, creating the pooled client on first use.
+        Creating the client does no I/O; the pool connects on the first operation.
+        """
+        if self.db is None:
+            self.client = AsyncMongoClient(
+                self.uri,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=self.max_pool_size,
+                # Records per-command latency for /metrics
+                event_listeners=[MongoCommandTimer()],
+            )
             self.db = self.client[self.db_name]
+        return self.db
+
+    def attach(self, database):
+        """Uses an existing database handle instead of a real client (e.g. an in-memory stand-in)."""
+        self.db = database
+
+    async def connect(self):
+        if self.db is not None and self.client is None:
+            logging.info("✅ Using an attached database, skipping the connection check")
+            return
+        try:
+            self.get_database()
+            await self.client.admin.command("ping")  # Force connection
             host, port = list(self.client.nodes)[0]
             logging.info(
                 f"✅ Database connected successfully at host : {host}, port : {port}"
@@ -40,11 +64,17 @@ class MongoDB:
             logging.error(f"❌ Unexpected Database error: {e}")
             raise HTTPException(status_code=500, detail="Unexpected Database error")
 
-    def close(self):
+    async def close(self):
         if self.client:
-            self.client.close()
+            await self.client.close()
+            self.client = None
+            self.db = None
             logging.info("🛑 Database connection closed.")
 
 
 # Create a global instance (like a singleton)
-db = MongoDB(uri=os.environ["DB_URI"], db_name="aryan")
+db = MongoDB(
+    uri=os.environ["DB_URI"],
+    db_name="aryan",
+    max_pool_size=int(os.getenv("DB_MAX_POOL_SIZE", "50")),
+)
@@ -1,45 +1,278 @@
 # chat_app/controllers/chat.py
 from fastapi import Request
+from contextlib import aclosing
+import asyncio
 import json
-from langchain_core.messages import AIMessageChunk, HumanMessage
+import os
+import time
+from utils.answer_cache import answer_cache
+from utils.admission import admission, AdmissionRejected
+from utils.metrics import stream_duration, time_to_first_token, tool_memo_saved, tracer
+from utils.thread_turns import ThreadBusy, thread_turns
 
+# Tokens are coalesced into one SSE frame per time or size window
+SSE_FLUSH_INTERVAL = float(os.getenv("SSE_FLUSH_INTERVAL_MS", "50")) / 1000
+SSE_FLUSH_CHARS = int(os.getenv("SSE_FLUSH_CHARS", "80"))
+# Comment frames keep proxies from closing a quiet stream (e.g. during tool calls)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+DISCONNECT_CHECK_SECONDS = 0.5
 
-# Controller
-async def stream_chat_response(request: Request, user_message: str, thread_id: str):
-    """
-    This async generator calls the LangGraph agent and streams back the response.
-    """
-    # Get the initialized app from our lifespan context
-    chat_app = request.app.state.chat_app
-    if not chat_app:
-        # This is a safeguard in case the app didn't initialize correctly
-        raise RuntimeError("Application is not initialized. Check server logs.")
+_DONE = object()
 
-    try:
-        input_data = {"messages": [HumanMessage(content=user_message)]}
-        # print("thread_id : ", thread_id)
-        config = {"configurable": {"thread_id": thread_id}}
+_BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+_RESUME_EXPIRED_MESSAGE = (
+    "The connection was lost and this answer is no longer available. Please send your message again."
+)
 
-        # Asynchronously stream events from the LangGraph application
+
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def _produce_tokens(chat_app, input_data, config, queue: asyncio.Queue, run: dict):
+    """Runs the graph and pushes the AI's text tokens onto the queue."""
+    from langchain_core.messages import AIMessageChunk
+    from utils.fast_paths import FAST_PATH_EVENT
+
+    try:
+        # Only chat model, tool and fast path events are used, skip building the rest
         async for event in chat_app.astream_events(
-            input_data, version="v2", config=config
+            input_data,
+            version="v2",
+            config=config,
+            include_types=["chat_model", "tool"],
+            include_names=[FAST_PATH_EVENT],
         ):
-            # We are interested in the 'on_chat_model_stream' events which contain the AI's content
             if event["event"] == "on_chat_model_stream":
                 chunk = event["data"]["chunk"]
                 if isinstance(chunk, AIMessageChunk) and chunk.content:
-                    # Format the data as a Server-Sent Event (SSE) and yield it.
-                    # This is the standard format for web streaming.
-                    yield f"data: {json.dumps({'event': 'data', 'data': chunk.content})}\n\n"
+                    queue.put_nowait(chunk.content)
+            elif event["event"] == "on_custom_event" and event["name"] == FAST_PATH_EVENT:
+                queue.put_nowait(event["data"]["text"])
+            elif event["event"] == "on_tool_start":
+                run["used_tools"] = True
+    finally:
+        queue.put_nowait(_DONE)
+
+
+async def _stream_run(chat_app, input_data, config, run: dict):
+    """
+    Streams one graph run as SSE data frames. The graph runs in its own task so
+    the stream can batch tokens while it produces them, and the run is
+    cancelled with the stream.
+    """
+    queue = asyncio.Queue()
+    producer = asyncio.create_task(
+        _produce_tokens(chat_app, input_data, config, queue, run)
+    )
+    try:
+        loop = asyncio.get_running_loop()
+        buffer = []
+        buffered_chars = 0
+        buffer_started = loop.time()
+        while True:
+            timeout = SSE_FLUSH_INTERVAL if buffer else None
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = None
+            if item is _DONE:
+                break
+
+            now = loop.time()
+            if item:
+                if not buffer:
+                    buffer_started = now
+                buffer.append(item)
+                buffered_chars += len(item)
+                run["text"].append(item)
+
+            if buffer and (
+                buffered_chars >= SSE_FLUSH_CHARS
+                or now - buffer_started >= SSE_FLUSH_INTERVAL
+            ):
+                # Format the data as a Server-Sent Event (SSE) and yield it.
+                yield _sse({"event": "data", "data": "".join(buffer)})
+                buffer, buffered_chars = [], 0
+
+        if buffer:
+            yield _sse({"event": "data", "data": "".join(buffer)})
+        # Surface any error raised by the graph run
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+
+async def _replay_answer(answer: str):
+    """Streams a cached answer with the same framing as a live run."""
+    for start in range(0, len(answer), SSE_FLUSH_CHARS):
+        yield _sse({"event": "data", "data": answer[start : start + SSE_FLUSH_CHARS]})
+
+
+async def _run_turn(runtime, user_message: str, thread_id: str):
+    """
+    Runs one chat turn through the LangGraph agent and yields its SSE frames.
+    Started by the thread coordinator, which fans the frames out to every
+    request waiting on this turn.
+    """
+    # Deferred so importing the app stays cheap on cold starts
+    from langchain_core.messages import AIMessage, HumanMessage
+    from utils.tool_memo import ToolMemo
+
+    # Every turn is timed for /metrics and traced under its own trace_id
+    started, started_wall = time.perf_counter(), time.time()
+    trace_id = tracer.new_trace_id()
+    outcome = "cancelled"
+    # Repeated read-only tool calls within this run are answered from memory
+    memo = ToolMemo()
+    try:
+        # Built here on the first request when the runtime starts lazily
+        chat_app = await runtime.get_chat_app()
+        input_data = {"messages": [HumanMessage(content=user_message)]}
+        # Pin the current portfolio snapshot so the whole run uses one prompt version
+        portfolio = await runtime.portfolio_cache.get()
+        config = {
+            "configurable": {
+                "thread_id": thread_id,
+                "trace_id": trace_id,
+                "portfolio": portfolio,
+                "tool_memo": memo,
+            }
+        }
+
+        # Opening questions only depend on the portfolio, so they can be answered from cache
+        state = await chat_app.aget_state(config)
+        first_turn = not state.values.get("messages")
+        if first_turn:
+            cached = answer_cache.get(user_message, portfolio.version)
+            if cached is not None:
+                time_to_first_token.observe(time.perf_counter() - started, source="cache")
+                async for frame in _replay_answer(cached):
+                    yield frame
+                # Record the exchange so follow-up turns have the context
+                exchange = [HumanMessage(content=user_message), AIMessage(content=cached)]
+                await chat_app.aupdate_state(
+                    config, {"messages": exchange}, as_node="agent"
+                )
+                outcome = "cache_hit"
+                yield _sse({"event": "end"})
+                return
+
+        run = {"used_tools": False, "text": []}
+        first_token = True
+        try:
+            # Wait for an LLM slot, or tell the client straight away that we're saturated
+            async with admission.slot(thread_id):
+                async with aclosing(
+                    _stream_run(chat_app, input_data, config, run)
+                ) as frames:
+                    async for frame in frames:
+                        if first_token and frame.startswith("data:"):
+                            first_token = False
+                            time_to_first_token.observe(
+                                time.perf_counter() - started, source="model"
+                            )
+                        yield frame
+        except AdmissionRejected as e:
+            print(f"Run for thread {thread_id} rejected by admission control: {e.reason}")
+            outcome = "busy"
+            yield _sse({"event": "busy", "data": _BUSY_MESSAGE})
+            return
+
+        if first_turn and not run["used_tools"] and run["text"]:
+            answer_cache.put(user_message, portfolio.version, "".join(run["text"]))
 
         # After the main stream is finished, send a final 'end' event
-        yield f"data: {json.dumps({'event': 'end'})}\n\n"
+        outcome = "completed"
+        yield _sse({"event": "end"})
 
+    except asyncio.CancelledError:
+        # Every client of this turn went away
+        print(f"Clients disconnected, cancelled the run for thread {thread_id}")
+        outcome = "disconnected"
+        raise
     except Exception as e:
         print(f"An error occurred during the stream for thread {thread_id}: {e}")
+        outcome = "error"
         # Send a specific error event to the client if something goes wrong
         error_event = {
             "event": "error",
             "data": "An error occurred while processing your request.",
         }
-        yield f"data: {json.dumps(error_event)}\n\n"
+        yield _sse(error_event)
+    finally:
+        duration = time.perf_counter() - started
+        stream_duration.observe(duration, outcome=outcome)
+        tool_memo_saved.observe(memo.saved_db_calls)
+        if memo.hits:
+            print(
+                f"♻️ Reused {memo.hits} tool results for thread {thread_id}, "
+                f"saving {memo.saved_db_calls} database calls"
+            )
+        tracer.emit(
+            "chat.turn",
+            thread_id,
+            trace_id,
+            started_wall,
+            duration,
+            span_id=tracer.root_span_id(trace_id),
+            parent_id=None,
+            status=outcome,
+        )
+
+
+# Controller
+async def stream_chat_response(
+    request: Request, user_message: str, thread_id: str, last_event_id: str = None
+):
+    """
+    This async generator streams back the answer to `user_message`. Turns for
+    the same thread run one at a time, and a request repeating a message that
+    is still being answered shares that turn's stream instead of running it again.
+    A reconnect carrying `last_event_id` continues the dropped stream from the
+    next event without running the graph again.
+    """
+    runtime = request.app.state.runtime
+    seen = 0
+    if last_event_id:
+        resumed = thread_turns.resume(thread_id, last_event_id)
+        if resumed is None:
+            yield _sse({"event": "error", "data": _RESUME_EXPIRED_MESSAGE})
+            return
+        turn, seen = resumed
+        print(f"Resuming the stream for thread {thread_id} after event {last_event_id}")
+    else:
+        try:
+            turn = thread_turns.join(
+                thread_id, user_message, lambda: _run_turn(runtime, user_message, thread_id)
+            )
+        except ThreadBusy:
+            yield _sse({"event": "busy", "data": _BUSY_MESSAGE})
+            return
+
+    try:
+        loop = asyncio.get_running_loop()
+        last_sent = last_check = loop.time()
+        while True:
+            await turn.wait(seen, DISCONNECT_CHECK_SECONDS)
+            now = loop.time()
+            if seen < len(turn.frames):
+                frames, seen = turn.frames[seen:], len(turn.frames)
+                for frame in frames:
+                    yield frame
+                last_sent = now
+            elif turn.done:
+                return
+            elif now - last_sent >= SSE_HEARTBEAT_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = now
+
+            if now - last_check >= DISCONNECT_CHECK_SECONDS:
+                last_check = now
+                if await request.is_disconnected():
+                    print(f"Client disconnected from the turn for thread {thread_id}")
+                    return
+    finally:
+        # The run is cancelled if no client is back within the resume grace period
+        thread_turns.leave(turn)
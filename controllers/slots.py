@@ -0,0 +1,69 @@
+# chat_app/controllers/slots.py
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+import hashlib
+import os
+import time
+from utils.slot_index import to_utc_naive
+
+SLOTS_DEFAULT_DAYS = int(os.getenv("SLOTS_DEFAULT_DAYS", "14"))
+SLOTS_MAX_DAYS = int(os.getenv("SLOTS_MAX_DAYS", "62"))
+# Holds expire and slots pass without a write, so ETags also roll over with time
+SLOTS_ETAG_SECONDS = int(os.getenv("SLOTS_ETAG_SECONDS", "60"))
+
+
+def _etag(version: int, query: str) -> str:
+    window = int(time.time() // SLOTS_ETAG_SECONDS)
+    key = f"{version}:{window}:{query}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:20] + '"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match list (RFC 9110 13.1.2)."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+# Controller
+async def get_free_slots(request: Request, start: datetime = None, end: datetime = None):
+    """
+    Returns every free business-hour slot between `start` and `end` without
+    involving the agent. A request whose If-None-Match still matches gets a
+    304 after reading only the meetings change counter.
+    """
+    # Deferred so importing the app stays cheap on cold starts
+    from utils.database_operations import calendar_version, find_free_slots
+
+    start = to_utc_naive(start) if start else datetime.utcnow()
+    end = to_utc_naive(end) if end else start + timedelta(days=SLOTS_DEFAULT_DAYS)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'.")
+    if end - start > timedelta(days=SLOTS_MAX_DAYS):
+        raise HTTPException(
+            status_code=400, detail=f"The range can't be longer than {SLOTS_MAX_DAYS} days."
+        )
+
+    version = await calendar_version()
+    # Keyed on the query as sent, so a default range keeps its ETag within a window
+    etag = _etag(version, request.url.query)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(etag, request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+
+    slots = await find_free_slots(start, end)
+    return JSONResponse(
+        {
+            "from": start.isoformat() + "Z",
+            "to": end.isoformat() + "Z",
+            "slots": [slot.isoformat() + "Z" for slot in slots],
+        },
+        headers=headers,
+    )
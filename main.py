@@ -1,33 +1,47 @@
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from utils.limiter import limiter
-from config.db import db
 from routers.chat import router as chat_router
+from routers.slots import router as slots_router
 from contextlib import asynccontextmanager
-import aiosqlite
-from utils.workflow import get_app
+import os
+from utils.loop_watchdog import LOOP_WATCHDOG, LoopWatchdog
+from utils.metrics import metrics, stats_gauges
+from utils.runtime import Runtime
+
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoint.sqlite")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Manages the application's startup and shutdown events.
+    The runtime owns every connection; with LAZY_INIT it builds them on first use.
     """
     print("Application startup: Initializing resources...")
-    conn = await aiosqlite.connect("checkpoint.sqlite")
-    chat_app_instance = await get_app(conn)
-    
+    # Started first so stalls during startup are reported too
+    watchdog = None
+    if LOOP_WATCHDOG:
+        watchdog = LoopWatchdog.from_env()
+        watchdog.start()
+        metrics.add_collector(
+            "loop_watchdog", lambda: stats_gauges("loop_watchdog", watchdog.stats())
+        )
+    runtime = Runtime.from_env(CHECKPOINT_PATH)
+    await runtime.start()
+
     # Store the resources in the application's state.
-    app.state.db_connection = conn
-    app.state.chat_app = chat_app_instance
+    app.state.runtime = runtime
     print("Application startup complete.")
     
     yield # The application is now running
     
     print("Application shutdown: Cleaning up resources...")
-    await app.state.db_connection.close()
-    print("Database connection closed.")
+    await runtime.stop()
+    if watchdog is not None:
+        await watchdog.stop()
 
 
 app = FastAPI(
@@ -46,22 +60,18 @@ app.add_middleware(
     allow_methods=["GET", "POST"],
     allow_credentials=True,
     allow_headers=["*"],
-    expose_headers=["Content-Type"],
+    expose_headers=["Content-Type", "ETag"],
 )
 
 app.include_router(chat_router, prefix="/api/v1", tags=["Chat"])
+app.include_router(slots_router, prefix="/api/v1", tags=["Slots"])
 
 
-# Connect on startup
-@app.on_event("startup")
-async def startup_db():
-    db.connect()
-
-
-# Disconnect on shutdown
-@app.on_event("shutdown")
-async def shutdown_db():
-    db.close()
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.get("/")
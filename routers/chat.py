@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi import APIRouter, HTTPException, Header, Request, Query
 from utils.limiter import limiter
 from controllers.chat import stream_chat_response
 # The pydantic model is no longer needed for a GET request
@@ -16,7 +16,9 @@ router = APIRouter(prefix="/chat")
 async def chat_stream(
     request: Request,
     user_message: str = Query(..., min_length=1), # Use Query for validation
-    thread_id: str = Query(...)
+    thread_id: str = Query(...),
+    # Sent by EventSource when it reconnects, so the dropped answer is resumed
+    last_event_id: str | None = Header(None),
 ):
     """
     Handles a GET request to stream chat responses using Server-Sent Events.
@@ -30,6 +32,6 @@ async def chat_stream(
 
     # Call the controller with the query parameters
     return StreamingResponse(
-        stream_chat_response(request, user_message, thread_id),
+        stream_chat_response(request, user_message, thread_id, last_event_id),
         media_type="text/event-stream",
     )
@@ -0,0 +1,21 @@
+from datetime import datetime
+from fastapi import APIRouter, Request, Query
+from utils.limiter import limiter
+from controllers.slots import get_free_slots
+
+router = APIRouter(prefix="/slots")
+
+
+@router.get("")
+@limiter.limit("5/second")
+async def list_free_slots(
+    request: Request,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+):
+    """
+    Lists the free meeting slots between `from` and `to` (ISO 8601, UTC if no
+    offset is given) for the frontend's calendar. Defaults to the next two weeks.
+    Example: /slots?from=2025-06-01&to=2025-06-15
+    """
+    return await get_free_slots(request, start, end)
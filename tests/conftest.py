@@ -0,0 +1,41 @@
+"""
+Shared setup: the in-memory database from benchmarks.fakes stands in for
+MongoDB behind `config.db`, so the data layer runs offline.
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_URI", "mongodb://offline.invalid:27017")
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ.setdefault("TAVILY_API_KEY", "offline")
+os.environ.setdefault("SMTP_USER", "assistant@example.com")
+
+import email_validator  # noqa: E402
+
+from benchmarks.fakes import InMemoryDatabase  # noqa: E402
+from config.db import db  # noqa: E402
+
+# Email deliverability checks need DNS
+email_validator.CHECK_DELIVERABILITY = False
+
+# Attached before anything imports utils.database_operations, which binds its collections
+database = InMemoryDatabase()
+db.attach(database)
+
+
+@pytest.fixture
+def memory_db():
+    """The in-memory database, emptied and with the managed indexes, for each test."""
+    from utils.database_operations import slot_index
+    from utils.indexes import ensure_indexes
+
+    for collection in database.collections.values():
+        collection.docs.clear()
+    asyncio.run(ensure_indexes(database))
+    slot_index._loaded_at = None
+    return database
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+import asyncio
+import json
+import uuid
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+import pytest
+
+from benchmarks.scripted_model import ScriptedChatModel
+from controllers import chat
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+async def _rejection(controller: AdmissionController, thread_id: str) -> str:
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire(thread_id)
+    return rejected.value.reason
+
+
+def test_full_queue_is_rejected_at_once():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert await _rejection(controller, "c") == "queue_full"
+        controller.release("a")
+        await waiter
+        assert controller.stats()["admitted"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_queued_run_times_out():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+        async with controller.slot("a"):
+            assert await _rejection(controller, "b") == "queue_timeout"
+            assert controller.waiting == 0
+        # The timed-out thread holds nothing, so it gets the next free slot
+        async with controller.slot("b"):
+            assert controller.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_second_run_for_a_thread_is_rejected():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_per_thread=1)
+        async with controller.slot("a"):
+            assert await _rejection(controller, "a") == "thread_busy"
+            async with controller.slot("b"):
+                pass
+        assert controller.rejected == {"thread_busy": 1}
+
+    asyncio.run(scenario())
+
+
+def _runtime(model: ScriptedChatModel):
+    async def agent(state):
+        return {"messages": [await model.ainvoke(state["messages"])]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("agent", agent)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    chat_app = graph.compile(checkpointer=MemorySaver())
+
+    async def get_chat_app():
+        return chat_app
+
+    async def get_portfolio():
+        return SimpleNamespace(version=uuid.uuid4().hex)
+
+    return SimpleNamespace(
+        get_chat_app=get_chat_app, portfolio_cache=SimpleNamespace(get=get_portfolio)
+    )
+
+
+async def _events(runtime) -> list:
+    frames = [f async for f in chat._run_turn(runtime, "Hello?", str(uuid.uuid4()))]
+    return [json.loads(f.split("data: ", 1)[1]) for f in frames]
+
+
+def test_saturated_turn_streams_busy(monkeypatch):
+    async def scenario():
+        model = ScriptedChatModel(script=[AIMessage(content="Hi there")])
+        runtime = _runtime(model)
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        monkeypatch.setattr(chat, "admission", controller)
+
+        async with controller.slot("someone else"):
+            events = await _events(runtime)
+        assert events == [{"event": "busy", "data": chat._BUSY_MESSAGE}]
+        assert model.position == 0
+
+        events = await _events(runtime)
+        assert "".join(e["data"] for e in events if e["event"] == "data").strip() == "Hi there"
+        assert events[-1] == {"event": "end"}
+
+    asyncio.run(scenario())
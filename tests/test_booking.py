@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+import asyncio
+
+from utils import database_operations as ops
+from utils.meeting_tools import book_meeting_tool, reschedule_tool, verify_meeting_tool
+
+RACERS = 10
+
+
+def _slot(days: int, hour: int = 10) -> datetime:
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=days, hours=hour)
+
+
+def _expire(database, email: str):
+    for meeting in database["meetings"].docs:
+        if meeting["client_email"] == email:
+            meeting["expiresAt"] = datetime.utcnow() - timedelta(minutes=1)
+
+
+def test_rebooking_over_own_expired_hold(memory_db):
+    slot = _slot(20)
+
+    async def scenario():
+        await ops.book_meeting("Ann", "ann@example.com", "A project", slot)
+        _expire(memory_db, "ann@example.com")
+        # Not reaped yet, so the old hold still occupies (client_email, date)
+        return await ops.book_meeting("Ann", "ann@example.com", "A project", slot)
+
+    otp = asyncio.run(scenario())
+    holds = [m for m in memory_db["meetings"].docs if m["date"] == slot]
+    assert len(holds) == 1
+    assert holds[0]["OTP"] == otp
+    assert holds[0]["expiresAt"] > datetime.utcnow()
+
+
+def test_rebooking_live_hold_sends_a_fresh_code(memory_db):
+    slot = _slot(21)
+
+    async def scenario():
+        first = await ops.book_meeting("Ann", "ann@example.com", "A project", slot)
+        second = await ops.book_meeting("Ann", "ann@example.com", "A project", slot)
+        return first, second
+
+    _, otp = asyncio.run(scenario())
+    holds = [m for m in memory_db["meetings"].docs if m["date"] == slot]
+    assert len(holds) == 1
+    assert holds[0]["OTP"] == otp
+
+
+def test_duplicate_bookings_only_skip_their_own_index(memory_db):
+    from utils.indexes import ensure_indexes
+
+    meetings = memory_db["meetings"]
+    meetings.indexes = []
+    duplicate = {"client_email": "ann@example.com", "date": _slot(30), "isVerified": False}
+    meetings.docs += [dict(duplicate), dict(duplicate)]
+
+    created = asyncio.run(ensure_indexes(memory_db))
+
+    assert "client_email_1_date_-1" not in created["meetings"]
+    assert "date_verified_unique" in created["meetings"]
+    assert "expiresAt_1" in created["meetings"]
+
+
+def _racers(name: str) -> list:
+    return [f"{name}{n}@example.com" for n in range(RACERS)]
+
+
+def _confirmed(database, date: datetime) -> list:
+    return [m for m in database["meetings"].docs if m["date"] == date and m["isVerified"]]
+
+
+async def _book(email: str, slot: datetime) -> dict:
+    return await book_meeting_tool.ainvoke(
+        {
+            "client_name": "Racer",
+            "client_email": email,
+            "client_project_description": "Stress test",
+            "datetime_str": slot.isoformat(),
+        }
+    )
+
+
+def _insert_meeting(database, email: str, date: datetime, **fields):
+    document = {
+        "client_name": "Racer",
+        "client_email": email,
+        "client_project_description": "Stress test",
+        "date": date,
+        "isCompleted": False,
+        **fields,
+    }
+    asyncio.run(database["meetings"].insert_one(document))
+
+
+def test_concurrent_bookings_of_one_slot(memory_db):
+    slot = _slot(40)
+
+    async def scenario():
+        return await asyncio.gather(*(_book(email, slot) for email in _racers("racer")))
+
+    booked = asyncio.run(scenario())
+    statuses = sorted(r["status"] for r in booked)
+    assert statuses == ["slot_taken"] * (RACERS - 1) + ["tentative"]
+    holds = [m for m in memory_db["meetings"].docs if m["date"] == slot]
+    assert len(holds) == 1
+
+
+def test_concurrent_verifications_of_one_slot(memory_db):
+    slot = _slot(41)
+    # Holds left behind by racing upserts, which a real server can allow
+    for email in _racers("racer"):
+        _insert_meeting(
+            memory_db,
+            email,
+            slot,
+            isVerified=False,
+            OTP=1111,
+            expiresAt=datetime.utcnow() + timedelta(minutes=10),
+            otp_attempts=0,
+        )
+
+    async def scenario():
+        return await asyncio.gather(
+            *(
+                verify_meeting_tool.ainvoke({"client_email": email, "otp": 1111})
+                for email in _racers("racer")
+            )
+        )
+
+    verified = asyncio.run(scenario())
+    statuses = sorted(r["status"] for r in verified)
+    assert statuses == ["confirmed"] + ["slot_taken"] * (RACERS - 1)
+    assert len(_confirmed(memory_db, slot)) == 1
+
+
+def test_losing_verification_frees_its_hold_in_the_slot_index(memory_db):
+    # Inside the slot index horizon
+    slot = _slot(5, 11)
+    for email in ("ann@example.com", "bob@example.com"):
+        _insert_meeting(
+            memory_db,
+            email,
+            slot,
+            isVerified=False,
+            OTP=1111,
+            expiresAt=datetime.utcnow() + timedelta(minutes=10),
+            otp_attempts=0,
+        )
+
+    async def scenario():
+        await ops.slot_index.refresh()
+        await ops.verify_meeting("ann@example.com", 1111)
+        version = await ops.calendar_version()
+        try:
+            await ops.verify_meeting("bob@example.com", 1111)
+        except ops.SlotTaken:
+            pass
+        return version, await ops.calendar_version()
+
+    before, after = asyncio.run(scenario())
+    assert after > before
+    assert ops.slot_index._dates.count(slot) == 1
+    assert len([m for m in memory_db["meetings"].docs if m["date"] == slot]) == 1
+
+
+def test_concurrent_reschedules_onto_held_and_free_slots(memory_db):
+    movers = _racers("mover")
+    for n, email in enumerate(movers):
+        _insert_meeting(memory_db, email, _slot(50 + n, 16), isVerified=True)
+    held, free = _slot(42, 14), _slot(42, 16)
+
+    async def scenario():
+        booking = await _book("holder@example.com", held)
+        assert booking["status"] == "tentative", booking
+        onto_held = await asyncio.gather(
+            *(
+                reschedule_tool.ainvoke({"client_email": e, "datetime_str": held.isoformat()})
+                for e in movers
+            )
+        )
+        otp = next(
+            m["OTP"]
+            for m in memory_db["meetings"].docs
+            if m["client_email"] == "holder@example.com"
+        )
+        verified = await verify_meeting_tool.ainvoke(
+            {"client_email": "holder@example.com", "otp": otp}
+        )
+        onto_free = await asyncio.gather(
+            *(
+                reschedule_tool.ainvoke({"client_email": e, "datetime_str": free.isoformat()})
+                for e in movers
+            )
+        )
+        return onto_held, verified, onto_free
+
+    onto_held, verified, onto_free = asyncio.run(scenario())
+    # The hold was there first, so no reschedule may take its slot
+    assert all(r["status"] == "slot_taken" for r in onto_held), onto_held
+    assert verified["status"] == "confirmed", verified
+    statuses = sorted(r["status"] for r in onto_free)
+    assert statuses == ["confirmed"] + ["slot_taken"] * (RACERS - 1)
+    for date in (held, free):
+        assert len(_confirmed(memory_db, date)) == 1, f"{date} was double-booked"
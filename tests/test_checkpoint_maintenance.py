@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+from benchmarks.checkpointers import _config, _put
+from utils.checkpoint_maintenance import CheckpointMaintainer
+from utils.checkpointer import PooledAsyncSqliteSaver
+
+
+class _RecordingLock(asyncio.Lock):
+    """The saver's lock, noting how many rows changed during each hold."""
+
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+        self.changes = []
+
+    async def __aenter__(self):
+        await super().__aenter__()
+        self._before = self.conn.total_changes
+
+    async def __aexit__(self, *exc):
+        self.changes.append(self.conn.total_changes - self._before)
+        return await super().__aexit__(*exc)
+
+
+async def _count(saver, table: str) -> int:
+    async with saver.conn.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+def test_prune_holds_the_lock_one_batch_at_a_time(tmp_path):
+    path = os.path.join(tmp_path, "checkpoint.sqlite")
+
+    async def scenario():
+        saver = await PooledAsyncSqliteSaver.connect(path, readers=0)
+        maintainer = CheckpointMaintainer(
+            saver, path, keep_last=3, batch_size=5, vacuum_free_ratio=0, vacuum_pages=2
+        )
+        await maintainer.configure()
+        config = None
+        for step in range(40):
+            config = await _put(saver, "busy", config, source="loop", step=step)
+            await saver.aput_writes(config, [("messages", f"turn {step}")], f"task-{step}")
+
+        saver.lock = _RecordingLock(saver.conn)
+        deleted, expired = await maintainer.prune()
+
+        latest = await saver.aget_tuple(_config("busy"))
+        counts = await _count(saver, "checkpoints"), await _count(saver, "writes")
+        vacuumed = await maintainer.compact()
+        (free,) = (await maintainer._execute("PRAGMA freelist_count"))[0]
+        await saver.aclose()
+        return saver.lock.changes, deleted, expired, latest, config, counts, vacuumed, free
+
+    held, deleted, expired, latest, config, counts, vacuumed, free = asyncio.run(scenario())
+    # Checkpoint writes queued behind the lock never wait for more than one batch
+    assert max(held) <= 5
+    assert (deleted, expired) == (37 + 37, 0)
+    assert latest.config == config
+    assert counts == (3, 3)
+    assert vacuumed and free == 0
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import asyncio
+import json
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from utils import database_operations as ops
+from utils.fast_paths import FastPathRouter, route_after_fast_path
+from utils.meeting_tools import verify_meeting_tool
+from utils.tool_executor import ToolExecutor
+
+EMAIL = "ann@example.com"
+
+
+def _exchange(name: str, args: dict, result: dict) -> list:
+    call_id = f"call_{uuid.uuid4().hex[:8]}"
+    return [
+        AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id}]),
+        ToolMessage(content=json.dumps(result), name=name, tool_call_id=call_id),
+    ]
+
+
+def _route(messages: list) -> dict:
+    router = FastPathRouter(ToolExecutor([verify_meeting_tool]), enabled=True)
+    # Run as a runnable so the router can dispatch its streaming event
+    return asyncio.run(RunnableLambda(router).ainvoke({"messages": messages}))
+
+
+def test_confirmation_names_the_booked_slot(memory_db):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    first, booked = today + timedelta(days=20, hours=10), today + timedelta(days=22, hours=14)
+    otp = asyncio.run(ops.book_meeting("Ann", EMAIL, "A project", booked))
+    book = {"client_name": "Ann", "client_email": EMAIL, "client_project_description": "A project"}
+    # The first slot was available when checked but taken by the time Ann booked it
+    history = [
+        HumanMessage(content="Can I book a meeting?"),
+        *_exchange(
+            "check_slot_availability",
+            {"datetime_str": first.isoformat()},
+            {"available": True, "slot": first.isoformat()},
+        ),
+        *_exchange(
+            "book_meeting",
+            {**book, "datetime_str": first.isoformat()},
+            {"status": "slot_taken", "suggestions": [booked.isoformat() + "Z"]},
+        ),
+        *_exchange(
+            "book_meeting", {**book, "datetime_str": booked.isoformat()}, {"status": "tentative"}
+        ),
+        HumanMessage(content=str(otp)),
+    ]
+
+    update = _route(history)
+
+    reply = update["messages"][-1]
+    assert route_after_fast_path({"messages": history + update["messages"]}) == "end"
+    assert booked.strftime("%B %d at %H:%M") in reply.content
+    assert first.strftime("%B %d at %H:%M") not in reply.content
+
+
+def test_ambiguous_reply_goes_to_the_agent(memory_db):
+    history = [
+        *_exchange(
+            "book_meeting",
+            {"client_email": EMAIL, "datetime_str": "2030-01-01T10:00:00"},
+            {"status": "tentative"},
+        ),
+        HumanMessage(content="my code is 1234 I think"),
+    ]
+
+    assert _route(history) == {"messages": []}
@@ -0,0 +1,18 @@
+from utils.metrics import latency_stats, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert percentile(values, 0.5) == 0.3
+    assert percentile(values, 0.95) == 0.5
+    assert percentile(values, 1.0) == 0.5
+    assert percentile([], 0.5) is None
+
+
+def test_latency_stats_in_milliseconds():
+    assert latency_stats("wait", [0.002, 0.001, 0.010]) == {
+        "wait_p50_ms": 2.0,
+        "wait_p95_ms": 10.0,
+        "wait_max_ms": 10.0,
+    }
+    assert latency_stats("write", []) == {"write_p50_ms": 0.0, "write_p95_ms": 0.0, "write_max_ms": 0.0}
@@ -0,0 +1,45 @@
+"""
+Explains the queries the data layer actually sends. They are recorded from
+the real operations on the in-memory database, so they can't drift from
+the code. The plan check needs a server: set MONGO_TEST_URI to run it.
+"""
+
+import asyncio
+import os
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from benchmarks.explain import explain_queries, record_hot_queries
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+HOT_CALLERS = {
+    "database_operations.book_meeting",
+    "database_operations.verify_meeting",
+    "database_operations.find_client",
+    "database_operations.reschedule",
+    "database_operations.delete_unverified_meeting",
+    "database_operations.reclaim_expired_holds",
+    "database_operations.find_free_slots",
+    "database_operations.calendar_version",
+    "slot_index.SlotIndex.refresh",
+    "slot_index.SlotIndex.is_available",
+    "outbox.Outbox.process_batch",
+}
+
+
+def test_every_hot_query_is_recorded(memory_db):
+    queries = asyncio.run(record_hot_queries(memory_db))
+    assert HOT_CALLERS <= {caller for caller, _, _ in queries}
+
+
+@pytest.mark.skipif(not MONGO_TEST_URI, reason="needs a MongoDB server (set MONGO_TEST_URI)")
+def test_hot_queries_use_indexes(memory_db):
+    queries = asyncio.run(record_hot_queries(memory_db))
+    try:
+        plans = asyncio.run(explain_queries(MONGO_TEST_URI, queries, "explain_test"))
+    except ServerSelectionTimeoutError:
+        pytest.skip(f"no MongoDB server at {MONGO_TEST_URI}")
+    scans = [f"{caller}: {' > '.join(stages)}" for caller, stages in plans if "COLLSCAN" in stages]
+    assert not scans, "\n".join(scans)
@@ -0,0 +1,21 @@
+import pytest
+
+from controllers.slots import _etag_matches
+
+ETAG = '"0123456789abcdef0123"'
+
+
+@pytest.mark.parametrize(
+    "header",
+    [ETAG, f'W/{ETAG}', f'"other", {ETAG}', f'"other",W/{ETAG} ', "*"],
+)
+def test_matching_if_none_match(header):
+    assert _etag_matches(ETAG, header)
+
+
+@pytest.mark.parametrize(
+    "header",
+    ["", '"other"', f'"x{ETAG[1:]}', ETAG[1:-1], f'"prefix-{ETAG[1:-1]}-suffix"'],
+)
+def test_non_matching_if_none_match(header):
+    assert not _etag_matches(ETAG, header)
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+
+from utils import time_tools
+from utils.time_tools import TimeNeeded, resolve_datetime, resolve_datetime_tool
+
+# A Wednesday morning
+NOW = datetime(2025, 10, 15, 9, 30, 12)
+
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(time_tools, "utcnow", lambda: NOW)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("now", datetime(2025, 10, 15, 9, 30, 12)),
+        ("in 2 hours", datetime(2025, 10, 15, 11, 30, 12)),
+        ("in 2 days at 3pm", datetime(2025, 10, 17, 15, 0)),
+        ("in 3 days morning", datetime(2025, 10, 18, 10, 0)),
+        ("in 1 week 10:30", datetime(2025, 10, 22, 10, 30)),
+        ("tomorrow 3pm", datetime(2025, 10, 16, 15, 0)),
+        ("day after tomorrow at 10am", datetime(2025, 10, 17, 10, 0)),
+        ("next Friday at 10:30", datetime(2025, 10, 17, 10, 30)),
+        ("next wednesday 4pm", datetime(2025, 10, 22, 16, 0)),
+        ("tues 4pm", datetime(2025, 10, 21, 16, 0)),
+        ("Oct 20 2pm", datetime(2025, 10, 20, 14, 0)),
+        ("20 oct. at 2pm", datetime(2025, 10, 20, 14, 0)),
+        ("sept 3rd 10am", datetime(2026, 9, 3, 10, 0)),
+        ("August 15, 2026 2pm", datetime(2026, 8, 15, 14, 0)),
+        ("at 4 pm on the 20th", datetime(2025, 10, 20, 16, 0)),
+        ("the 10th at 10am", datetime(2025, 11, 10, 10, 0)),
+        ("2025-10-20T14:00:00", datetime(2025, 10, 20, 14, 0)),
+        ("2025-10-20T14:00:00Z", datetime(2025, 10, 20, 14, 0)),
+        ("tomorrow afternoon", datetime(2025, 10, 16, 14, 0)),
+        ("3pm", datetime(2025, 10, 15, 15, 0)),
+        ("9am", datetime(2025, 10, 16, 9, 0)),
+    ],
+)
+def test_resolves(expression, expected):
+    assert resolve_datetime(expression) == expected
+
+
+@pytest.mark.parametrize("expression", ["next Friday", "tomorrow at 3", "Oct 20", "2025-10-20", "in 2 days"])
+def test_date_without_a_time_needs_one(expression):
+    with pytest.raises(TimeNeeded):
+        resolve_datetime(expression)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "next month at 3pm",
+        "20/10 2pm",
+        "tomorrow 2pm +05:30",
+        "sometime soon",
+        "13pm",
+        "25:00",
+        "in 2 hours at 3pm",
+    ],
+)
+def test_unparsed_parts_are_errors(expression):
+    with pytest.raises(ValueError) as error:
+        resolve_datetime(expression)
+    assert not isinstance(error.value, TimeNeeded)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["tomorrow 3pm EST", "3pm IST", "friday at 2pm pacific", "10am my time", "GMT+5 3pm", "2pm UTC"],
+)
+def test_time_zones_are_errors(expression):
+    with pytest.raises(ValueError, match="UTC"):
+        resolve_datetime(expression)
+
+
+def test_tool_flags_a_missing_time():
+    result = resolve_datetime_tool.invoke({"expression": "next Friday"})
+    assert result["needs_time"] is True
+    assert result["date"] == "2025-10-17"
+    assert "datetime_str" not in result
+
+
+def test_tool_returns_iso_time():
+    result = resolve_datetime_tool.invoke({"expression": "Oct 20 2pm"})
+    assert result["datetime_str"] == "2025-10-20T14:00:00"
+    assert result["weekday"] == "Monday"
+    assert result["current_utc"] == "2025-10-15T09:30:12"
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+import asyncio
+
+from utils import database_operations as ops
+from utils.meeting_tools import check_slot_availability, lookup_client_tool
+from utils.tool_executor import ToolExecutor
+from utils.tool_memo import ToolMemo
+
+
+def _run_twice(name: str, args: dict) -> ToolMemo:
+    executor = ToolExecutor([check_slot_availability, lookup_client_tool])
+    memo = ToolMemo()
+    config = {"configurable": {"tool_memo": memo}}
+
+    async def scenario():
+        for n in range(2):
+            await executor.run_call({"name": name, "args": args, "id": f"call_{n}"}, config)
+
+    asyncio.run(scenario())
+    return memo
+
+
+def test_slot_index_reload_is_not_counted_as_saved(memory_db):
+    ops.slot_index._loaded_at = None
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    slot = (today + timedelta(days=3, hours=10)).isoformat()
+
+    memo = _run_twice("check_slot_availability", {"datetime_str": slot})
+
+    # The cold call reloaded the index; the repeat wouldn't have queried at all
+    assert memo.hits == 1
+    assert memo.saved_db_calls == 0
+
+
+def test_client_lookup_hit_saves_its_query(memory_db):
+    memo = _run_twice("lookup_client", {"client_email": "ann@example.com"})
+
+    assert memo.hits == 1
+    assert memo.saved_db_calls == 1
@@ -0,0 +1,112 @@
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import time
+
+from utils.metrics import latency_stats
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run can't be admitted. `reason` says which limit was hit."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Caps how many agent runs hit the LLM at once.
+
+    At most `max_concurrent` runs are active globally and `max_per_thread` per
+    thread_id. Extra runs wait in a FIFO queue of at most `max_queue` entries
+    for up to `queue_timeout` seconds. When the queue is full, or the wait
+    times out, the run is rejected so the caller can answer "busy" right away.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_per_thread: int = 1,
+        max_queue: int = 32,
+        queue_timeout: float = 10,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_thread = max_per_thread
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._per_thread = Counter()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = Counter()
+        self.wait_times = deque(maxlen=1000)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrent=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            max_per_thread=int(os.getenv("LLM_MAX_CONCURRENCY_PER_THREAD", "1")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10")),
+        )
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason)
+
+    async def acquire(self, thread_id: str):
+        if self._per_thread[thread_id] >= self.max_per_thread:
+            self._reject("thread_busy")
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self._reject("queue_full")
+
+        self._per_thread[thread_id] += 1
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._release_thread(thread_id)
+            self._reject("queue_timeout")
+        except BaseException:
+            self._release_thread(thread_id)
+            raise
+        finally:
+            self.waiting -= 1
+            self.wait_times.append(time.perf_counter() - start)
+        self.active += 1
+        self.admitted += 1
+
+    def release(self, thread_id: str):
+        self.active -= 1
+        self._semaphore.release()
+        self._release_thread(thread_id)
+
+    def _release_thread(self, thread_id: str):
+        self._per_thread[thread_id] -= 1
+        if self._per_thread[thread_id] <= 0:
+            del self._per_thread[thread_id]
+
+    @asynccontextmanager
+    async def slot(self, thread_id: str):
+        await self.acquire(thread_id)
+        try:
+            yield
+        finally:
+            self.release(thread_id)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            **latency_stats("wait", self.wait_times),
+        }
+
+
+# Global admission controller for agent runs
+admission = AdmissionController.from_env()
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import time
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases and strips punctuation so trivially different phrasings share a key."""
+    question = _PUNCTUATION_RE.sub(" ", question.lower())
+    return _WHITESPACE_RE.sub(" ", question).strip()
+
+
+class AnswerCache:
+    """
+    LRU/TTL cache of answers to first-turn questions that needed no tools.
+
+    Keys combine the normalized question with the portfolio snapshot version,
+    and the whole cache is dropped the first time a new version is seen, so
+    answers never outlive the portfolio data they were generated from.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+        )
+
+    def _key(self, question: str, version: str) -> str:
+        text = f"{version}\x00{normalize_question(question)}"
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, question: str, version: str):
+        self._check_version(version)
+        key = self._key(question, version)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, question: str, version: str, answer: str):
+        self._check_version(version)
+        key = self._key(question, version)
+        self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.stores += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global cache shared by every stream
+answer_cache = AnswerCache.from_env()
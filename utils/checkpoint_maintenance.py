@@ -0,0 +1,257 @@
+from collections import deque
+from datetime import datetime, timedelta
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from utils.metrics import checkpoint_duration, latency_stats
+
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100ns ticks
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+class TimedAsyncSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that records how long each checkpoint read and write takes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_latencies = deque(maxlen=1000)
+
+    def _record_write(self, operation: str, start: float):
+        elapsed = time.perf_counter() - start
+        self.write_latencies.append(elapsed)
+        checkpoint_duration.observe(elapsed, operation=operation)
+
+    async def aget_tuple(self, config):
+        with checkpoint_duration.time(operation="get"):
+            return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        start = time.perf_counter()
+        try:
+            return await super().aput(config, checkpoint, metadata, new_versions)
+        finally:
+            self._record_write("put", start)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        start = time.perf_counter()
+        try:
+            return await super().aput_writes(config, writes, task_id, task_path)
+        finally:
+            self._record_write("put_writes", start)
+
+
+def checkpoint_time(checkpoint_id: str) -> datetime:
+    """Checkpoint ids are UUIDv6, so the creation time is encoded in the id itself."""
+    value = uuid.UUID(checkpoint_id).int
+    ticks = ((value >> 80) << 12) | ((value >> 64) & 0xFFF)
+    return datetime.utcfromtimestamp((ticks - _UUID_EPOCH_OFFSET) / 1e7)
+
+
+class CheckpointMaintainer:
+    """
+    Keeps checkpoint.sqlite small and fast.
+
+    On startup it tunes the connection pragmas. A background task then
+    periodically keeps only the newest `keep_last` checkpoints of each thread,
+    deletes threads idle for longer than `thread_ttl_hours`, truncates the WAL
+    and frees pages incrementally once enough are free. All statements go
+    through the saver's own connection and lock, and aiosqlite runs them off
+    the event loop. Deletes and vacuums run in bounded steps that each take
+    the lock on their own, so checkpoint writes never wait for a whole run.
+    """
+
+    def __init__(
+        self,
+        saver: AsyncSqliteSaver,
+        path: str,
+        keep_last: int = 20,
+        thread_ttl_hours: float = 72,
+        interval_seconds: float = 600,
+        vacuum_free_ratio: float = 0.2,
+        batch_size: int = 500,
+        vacuum_pages: int = 1000,
+    ):
+        self.saver = saver
+        self.path = path
+        self.keep_last = keep_last
+        self.thread_ttl = timedelta(hours=thread_ttl_hours)
+        self.interval_seconds = interval_seconds
+        self.vacuum_free_ratio = vacuum_free_ratio
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.last_run = {}
+        self._task = None
+
+    @classmethod
+    def from_env(cls, saver: AsyncSqliteSaver, path: str):
+        return cls(
+            saver,
+            path,
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+            thread_ttl_hours=float(os.getenv("CHECKPOINT_THREAD_TTL_HOURS", "72")),
+            interval_seconds=float(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL", "600")),
+            batch_size=int(os.getenv("CHECKPOINT_PRUNE_BATCH", "500")),
+        )
+
+    async def _execute(self, sql: str, params=()):
+        async with self.saver.lock:
+            async with self.saver.conn.execute(sql, params) as cursor:
+                rows = await cursor.fetchall()
+            await self.saver.conn.commit()
+            return rows
+
+    async def configure(self):
+        await self.saver.setup()
+        for pragma in (
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            "PRAGMA busy_timeout=5000",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA cache_size=-16000",
+            "PRAGMA mmap_size=134217728",
+            "PRAGMA journal_size_limit=67108864",
+        ):
+            await self._execute(pragma)
+        (mode,) = (await self._execute("PRAGMA auto_vacuum"))[0]
+        if mode == 0:
+            # A file created without it needs one full VACUUM to switch over. That
+            # happens here, while the runtime is still being built, and never again;
+            # compaction afterwards only frees pages incrementally.
+            await self._execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self._execute("VACUUM")
+
+    async def _delete_in_batches(self, sql: str, params=()) -> int:
+        """
+        Runs a DELETE whose rowid subquery ends in `LIMIT ?` until a batch comes
+        back short. The saver's lock is taken per batch, so checkpoint writes
+        queued behind it run in between. Returns the number of rows deleted.
+        """
+        deleted = 0
+        while True:
+            async with self.saver.lock:
+                async with self.saver.conn.execute(sql, (*params, self.batch_size)) as cursor:
+                    count = cursor.rowcount
+                await self.saver.conn.commit()
+            deleted += count
+            if count < self.batch_size:
+                return deleted
+            await asyncio.sleep(0)
+
+    async def prune(self):
+        """Applies the retention policy. Returns (checkpoints deleted, threads expired)."""
+        cutoff = datetime.utcnow() - self.thread_ttl
+        latest = await self._execute(
+            "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+        )
+        expired = [thread_id for thread_id, cid in latest if checkpoint_time(cid) < cutoff]
+
+        deleted = 0
+        for thread_id in expired:
+            for table in ("checkpoints", "writes"):
+                deleted += await self._delete_in_batches(
+                    f"""
+                    DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} WHERE thread_id = ? LIMIT ?
+                    )
+                    """,
+                    (thread_id,),
+                )
+        deleted += await self._delete_in_batches(
+            """
+            DELETE FROM checkpoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns
+                        ORDER BY checkpoint_id DESC
+                    ) AS position
+                    FROM checkpoints
+                ) WHERE position > ? LIMIT ?
+            )
+            """,
+            (self.keep_last,),
+        )
+        deleted += await self._delete_in_batches(
+            """
+            DELETE FROM writes WHERE rowid IN (
+                SELECT rowid FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns
+                    AND c.checkpoint_id = writes.checkpoint_id
+                ) LIMIT ?
+            )
+            """
+        )
+        return deleted, len(expired)
+
+    async def compact(self):
+        """
+        Truncates the WAL and, once enough pages are free, returns them to the
+        filesystem `vacuum_pages` at a time with incremental_vacuum, releasing
+        the lock between steps. Never runs a full VACUUM.
+        """
+        await self._execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        (mode,) = (await self._execute("PRAGMA auto_vacuum"))[0]
+        (free,) = (await self._execute("PRAGMA freelist_count"))[0]
+        (pages,) = (await self._execute("PRAGMA page_count"))[0]
+        if mode != 2 or not pages or free / pages < self.vacuum_free_ratio:
+            return False
+        while free:
+            await self._execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})")
+            (left,) = (await self._execute("PRAGMA freelist_count"))[0]
+            if left >= free:
+                break
+            free = left
+            await asyncio.sleep(0)
+        return True
+
+    async def run_once(self):
+        start = time.perf_counter()
+        deleted, expired = await self.prune()
+        vacuumed = await self.compact()
+        self.last_run = {
+            "at": datetime.utcnow().isoformat(),
+            "rows_deleted": deleted,
+            "threads_expired": expired,
+            "vacuumed": vacuumed,
+            "duration_seconds": round(time.perf_counter() - start, 3),
+        }
+        logging.info(f"🧹 Checkpoint maintenance: {self.stats()}")
+
+    def stats(self) -> dict:
+        size = 0
+        for suffix in ("", "-wal"):
+            if os.path.exists(self.path + suffix):
+                size += os.path.getsize(self.path + suffix)
+        latencies = list(getattr(self.saver, "write_latencies", []))
+        return {
+            "file_size_bytes": size,
+            "write_count": len(latencies),
+            **latency_stats("write", latencies),
+            "last_run": self.last_run,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"❌ Checkpoint maintenance failed: {e}")
@@ -0,0 +1,311 @@
+from contextlib import asynccontextmanager
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+import aiosqlite
+import asyncio
+import json
+import logging
+import os
+
+from config.db import db
+from utils.checkpoint_maintenance import TimedAsyncSqliteSaver
+from utils.indexes import ensure_indexes
+from utils.metrics import checkpoint_duration
+
+# "sqlite" keeps conversation state in a local file (one machine), "mongo"
+# keeps it in the service's MongoDB database (shared by every instance)
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_SQLITE_READERS = int(os.getenv("CHECKPOINT_SQLITE_READERS", "4"))
+
+
+# ✅ --- SQLite ---
+class PooledAsyncSqliteSaver(TimedAsyncSqliteSaver):
+    """
+    SQLite saver with a pool of read-only connections next to the writer.
+
+    The stock saver sends every read and write through one connection and one
+    lock, so a turn loading its thread waits behind every other turn's
+    checkpoint writes. Here writes keep the inherited connection and lock,
+    while `aget_tuple` and `alist` borrow one of `readers` connections and run
+    concurrently. WAL lets readers proceed during a write, including writes
+    from other worker processes sharing the same file.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, readers: list = (), **kwargs):
+        super().__init__(conn, **kwargs)
+        self.reader_conns = list(readers)
+        self._readers = asyncio.Queue()
+        for reader in self.reader_conns:
+            # A plain saver over the reader connection; the writer owns the schema
+            view = AsyncSqliteSaver(reader, serde=self.serde)
+            view.is_setup = True
+            self._readers.put_nowait(view)
+
+    @classmethod
+    async def connect(cls, path: str, readers: int = CHECKPOINT_SQLITE_READERS):
+        conn = await aiosqlite.connect(path)
+        if path == ":memory:":
+            # Every connection to :memory: is a separate database
+            readers = 0
+        else:
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+        reader_conns = []
+        for _ in range(readers):
+            reader = await aiosqlite.connect(path)
+            await reader.execute("PRAGMA busy_timeout=5000")
+            await reader.execute("PRAGMA query_only=ON")
+            reader_conns.append(reader)
+        return cls(conn, reader_conns)
+
+    @asynccontextmanager
+    async def _reader(self):
+        view = await self._readers.get()
+        try:
+            yield view
+        finally:
+            self._readers.put_nowait(view)
+
+    async def aget_tuple(self, config):
+        if not self.reader_conns:
+            return await super().aget_tuple(config)
+        await self.setup()
+        with checkpoint_duration.time(operation="get"):
+            async with self._reader() as view:
+                return await view.aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        if not self.reader_conns:
+            async for item in super().alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+        await self.setup()
+        async with self._reader() as view:
+            async for item in view.alist(config, filter=filter, before=before, limit=limit):
+                yield item
+
+    async def aclose(self):
+        for reader in self.reader_conns:
+            await reader.close()
+        await self.conn.close()
+
+
+# ✅ --- MongoDB ---
+CHECKPOINT_INDEXES = {
+    # Latest checkpoint of a thread, and lookups by id
+    "checkpoints": [
+        IndexModel(
+            [("thread_id", ASCENDING), ("checkpoint_ns", ASCENDING), ("checkpoint_id", DESCENDING)],
+            unique=True,
+        ),
+    ],
+    # Pending writes of a checkpoint, in task order
+    "checkpoint_writes": [
+        IndexModel(
+            [
+                ("thread_id", ASCENDING),
+                ("checkpoint_ns", ASCENDING),
+                ("checkpoint_id", ASCENDING),
+                ("task_id", ASCENDING),
+                ("idx", ASCENDING),
+            ],
+            unique=True,
+        ),
+    ],
+}
+
+
+class AsyncMongoSaver(BaseCheckpointSaver):
+    """
+    Checkpoint saver on the service's MongoDB database, so conversation state
+    is shared by every worker and instance instead of living in one file.
+
+    Documents mirror the SQLite tables: one per checkpoint and one per pending
+    write. Loading a thread is two indexed queries; a task's writes are sent
+    as one bulk upsert. Metadata is also stored as a plain document so `alist`
+    can filter on it.
+    """
+
+    def __init__(
+        self,
+        database,
+        *,
+        serde=None,
+        checkpoints: str = "checkpoints",
+        writes: str = "checkpoint_writes",
+    ):
+        super().__init__(serde=serde)
+        self.jsonplus_serde = JsonPlusSerializer()
+        self.database = database
+        self.checkpoints = database[checkpoints]
+        self.writes = database[writes]
+        self.is_setup = False
+        self._setup_lock = asyncio.Lock()
+
+    async def setup(self):
+        if self.is_setup:
+            return
+        async with self._setup_lock:
+            if not self.is_setup:
+                await ensure_indexes(self.database, CHECKPOINT_INDEXES)
+                self.is_setup = True
+
+    async def _pending_writes(self, docs: list) -> dict:
+        if not docs:
+            return {}
+        keys = [
+            {k: doc[k] for k in ("thread_id", "checkpoint_ns", "checkpoint_id")}
+            for doc in docs
+        ]
+        cursor = self.writes.find(
+            {"$or": keys},
+            {"_id": 0, "thread_id": 1, "checkpoint_ns": 1, "checkpoint_id": 1,
+             "task_id": 1, "channel": 1, "type": 1, "value": 1},
+        ).sort([("task_id", ASCENDING), ("idx", ASCENDING)])
+        writes = {}
+        async for w in cursor:
+            key = (w["thread_id"], w["checkpoint_ns"], w["checkpoint_id"])
+            writes.setdefault(key, []).append(
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["type"], w["value"])))
+            )
+        return writes
+
+    def _tuple(self, doc: dict, writes: dict) -> CheckpointTuple:
+        configurable = {
+            "thread_id": doc["thread_id"],
+            "checkpoint_ns": doc["checkpoint_ns"],
+        }
+        parent_id = doc.get("parent_checkpoint_id")
+        return CheckpointTuple(
+            {"configurable": {**configurable, "checkpoint_id": doc["checkpoint_id"]}},
+            self.serde.loads_typed((doc["type"], doc["checkpoint"])),
+            self.jsonplus_serde.loads(doc["metadata"]),
+            {"configurable": {**configurable, "checkpoint_id": parent_id}} if parent_id else None,
+            writes.get((doc["thread_id"], doc["checkpoint_ns"], doc["checkpoint_id"]), []),
+        )
+
+    async def aget_tuple(self, config):
+        await self.setup()
+        with checkpoint_duration.time(operation="get"):
+            query = {
+                "thread_id": str(config["configurable"]["thread_id"]),
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+            }
+            if checkpoint_id := get_checkpoint_id(config):
+                query["checkpoint_id"] = checkpoint_id
+            doc = await self.checkpoints.find_one(
+                query, {"_id": 0, "metadata_doc": 0}, sort=[("checkpoint_id", DESCENDING)]
+            )
+            if doc is None:
+                return None
+            return self._tuple(doc, await self._pending_writes([doc]))
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        await self.setup()
+        query = {}
+        if config is not None:
+            query["thread_id"] = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query["checkpoint_ns"] = checkpoint_ns
+            if checkpoint_id := get_checkpoint_id(config):
+                query["checkpoint_id"] = checkpoint_id
+        for key, value in (filter or {}).items():
+            query[f"metadata_doc.{key}"] = value
+        if before is not None:
+            query.setdefault("$and", []).append(
+                {"checkpoint_id": {"$lt": get_checkpoint_id(before)}}
+            )
+        cursor = self.checkpoints.find(query, {"_id": 0, "metadata_doc": 0}).sort(
+            "checkpoint_id", DESCENDING
+        )
+        if limit:
+            cursor = cursor.limit(limit)
+        docs = await cursor.to_list()
+        writes = await self._pending_writes(docs)
+        for doc in docs:
+            yield self._tuple(doc, writes)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        await self.setup()
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with checkpoint_duration.time(operation="put"):
+            type_, serialized = self.serde.dumps_typed(checkpoint)
+            serialized_metadata = self.jsonplus_serde.dumps(
+                get_checkpoint_metadata(config, metadata)
+            )
+            await self.checkpoints.update_one(
+                {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint["id"],
+                },
+                {
+                    "$set": {
+                        "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+                        "type": type_,
+                        "checkpoint": serialized,
+                        "metadata": serialized_metadata,
+                        "metadata_doc": json.loads(serialized_metadata),
+                    }
+                },
+                upsert=True,
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await self.setup()
+        # Special channels (errors, interrupts) overwrite, regular writes are kept once
+        operator = "$set" if all(w[0] in WRITES_IDX_MAP for w in writes) else "$setOnInsert"
+        requests = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            key = {
+                "thread_id": str(config["configurable"]["thread_id"]),
+                "checkpoint_ns": str(config["configurable"]["checkpoint_ns"]),
+                "checkpoint_id": str(config["configurable"]["checkpoint_id"]),
+                "task_id": task_id,
+                "idx": WRITES_IDX_MAP.get(channel, idx),
+            }
+            fields = {"channel": channel, "type": type_, "value": serialized, "task_path": task_path}
+            requests.append(UpdateOne(key, {operator: fields}, upsert=True))
+        if requests:
+            with checkpoint_duration.time(operation="put_writes"):
+                await self.writes.bulk_write(requests, ordered=False)
+
+    async def adelete_thread(self, thread_id: str):
+        await self.checkpoints.delete_many({"thread_id": str(thread_id)})
+        await self.writes.delete_many({"thread_id": str(thread_id)})
+
+    async def aclose(self):
+        # The MongoDB client belongs to config.db and is closed with it
+        pass
+
+
+async def build_checkpointer(path: str, backend: str = None):
+    """Opens the checkpoint saver selected by CHECKPOINT_BACKEND and creates its schema."""
+    backend = (backend or CHECKPOINT_BACKEND).lower()
+    if backend == "mongo":
+        saver = AsyncMongoSaver(db.get_database())
+    elif backend == "sqlite":
+        saver = await PooledAsyncSqliteSaver.connect(path)
+    else:
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND {backend!r}, expected 'sqlite' or 'mongo'")
+    await saver.setup()
+    logging.info(f"✅ Checkpoints stored in {backend}")
+    return saver
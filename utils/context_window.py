@@ -0,0 +1,121 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+import json
+
+# Tool arguments worth remembering for the rest of the booking flow
+FACT_ARGS = ("client_email", "client_name", "client_project_description", "datetime_str")
+
+# Booking stage reached after a successful call of each tool
+STAGE_BY_TOOL = {
+    "book_meeting": "awaiting_otp",
+    "verify_meeting": "confirmed",
+    "reschedule": "rescheduled",
+    "decline_meeting": "declined",
+}
+
+SUMMARY_CHARS = 200
+
+
+def tool_result(message: ToolMessage) -> dict:
+    try:
+        result = json.loads(message.content)
+    except (TypeError, ValueError):
+        return {}
+    return result if isinstance(result, dict) else {}
+
+
+def extract_booking_facts(messages: list) -> dict:
+    """Collects the booking details gathered so far (email, name, slot, OTP stage)."""
+    facts = {}
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                args = call.get("args", {})
+                for key in FACT_ARGS:
+                    if args.get(key):
+                        facts[key] = args[key]
+        elif isinstance(message, ToolMessage):
+            result = tool_result(message)
+            if message.name == "lookup_client" and result.get("client"):
+                facts["client_name"] = result["client"].get("client_name")
+            elif message.name == "check_slot_availability" and result.get("available"):
+                facts["available_slot"] = result.get("slot")
+            elif message.name in STAGE_BY_TOOL and result.get("status") in (
+                "tentative",
+                "confirmed",
+                "declined",
+            ):
+                facts["stage"] = STAGE_BY_TOOL[message.name]
+    return facts
+
+
+def format_booking_facts(facts: dict) -> str:
+    if not facts:
+        return ""
+    lines = "\n".join(f"- {key}: {value}" for key, value in facts.items())
+    return f"\n\n**Booking facts already collected in this conversation:**\n{lines}"
+
+
+def _summarize_tool_calls(message: AIMessage, results: list) -> AIMessage:
+    notes = []
+    for result in results:
+        content = result.content if isinstance(result.content, str) else str(result.content)
+        if len(content) > SUMMARY_CHARS:
+            content = content[:SUMMARY_CHARS] + "…"
+        notes.append(f"{result.name} → {content}")
+    text = message.content if isinstance(message.content, str) else ""
+    summary = f"(tool results: {'; '.join(notes)})" if notes else ""
+    return AIMessage(content="\n".join(part for part in (text, summary) if part))
+
+
+def _collapse_tool_messages(messages: list) -> list:
+    """Replaces each tool-call message and its results with one compact AI note."""
+    collapsed = []
+    i = 0
+    while i < len(messages):
+        message = messages[i]
+        if isinstance(message, AIMessage) and message.tool_calls:
+            j = i + 1
+            while j < len(messages) and isinstance(messages[j], ToolMessage):
+                j += 1
+            collapsed.append(_summarize_tool_calls(message, messages[i + 1 : j]))
+            i = j
+        elif isinstance(message, ToolMessage):
+            i += 1  # An orphaned result has nothing to attach to
+        else:
+            collapsed.append(message)
+            i += 1
+    return collapsed
+
+
+def compact_history(messages: list, max_tokens: int):
+    """
+    Fits the conversation into `max_tokens` for the next model call.
+
+    The current turn (from the latest human message on) is kept verbatim so
+    pending tool calls stay paired with their results. Earlier turns have
+    their tool traffic collapsed into short notes and are then trimmed from
+    the oldest end. Returns the compacted messages and the tokens saved.
+    """
+    before = count_tokens_approximately(messages)
+    if before <= max_tokens:
+        return messages, 0
+
+    last_human = max(
+        (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0
+    )
+    current = messages[last_human:]
+    remaining = max_tokens - count_tokens_approximately(current)
+
+    history = []
+    if remaining > 0:
+        history = trim_messages(
+            _collapse_tool_messages(messages[:last_human]),
+            max_tokens=remaining,
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            start_on="human",
+        )
+
+    compacted = history + current
+    return compacted, before - count_tokens_approximately(compacted)
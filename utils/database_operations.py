@@ -1,89 +1,191 @@
 from config.db import db
 from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import random
-from utils.send_mail import send_email
+from utils.outbox import outbox
+from utils.slot_index import SlotIndex, business_slots
 import os
 import asyncio
 
-# Connect to database
-db.connect()
-mongo_db = db.db
+# Async database handle (the pooled client connects on first use)
+mongo_db = db.get_database()
 
 # Collections
 Projects = mongo_db["projects"]
 Users = mongo_db["users"]
 Meetings = mongo_db["meetings"]
+Counters = mongo_db["counters"]
 
+# Unverified bookings are tentative holds that expire with their OTP
+OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", "10"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
 
-# Fetch all projects
-def find_all_projects():
-    return list(Projects.find({}))
 
+def live_filter(now: datetime = None) -> dict:
+    """Matches confirmed meetings and holds that haven't expired yet."""
+    return {
+        "$or": [
+            {"isVerified": True},
+            {"expiresAt": {"$gt": now or datetime.utcnow()}},
+        ]
+    }
 
-# Fetch single user (first one)
-def find_user():
-    return Users.find_one({})  # returns dict or None
 
+# Only the fields the assistant may see: never the _id or the OTP
+CLIENT_FIELDS = {
+    "_id": 0,
+    "client_name": 1,
+    "client_email": 1,
+    "client_project_description": 1,
+    "date": 1,
+    "isVerified": 1,
+}
 
-# Fetch verified meetings
-def find_all_meetings():
-    return list(Meetings.find({"isVerified": True}))
+class SlotTaken(Exception):
+    """Raised when another meeting already holds the requested slot."""
 
+    def __init__(self, alternatives: list):
+        super().__init__("The requested slot is already taken")
+        self.alternatives = alternatives
 
-# Combine them
-def find_portfolio_data():
-    user = find_user()
-    projects = find_all_projects()
-    meetings = find_all_meetings()
-    return user, projects, meetings
 
+# Bumped by every write that takes or frees a slot; the slots endpoint derives its ETag from it
+async def _calendar_changed():
+    await Counters.update_one({"_id": "meetings"}, {"$inc": {"version": 1}}, upsert=True)
 
-def is_slot_available(date: datetime) -> bool:
-    """Checks if a slot is available and is not in the past."""
-    # A slot in the past is never available.
-    if date < datetime.utcnow():
-        return False
-    # Check if a meeting already exists at this time
-    return Meetings.find_one({"date": date}) is None
 
+async def calendar_version() -> int:
+    counter = await Counters.find_one({"_id": "meetings"}, {"version": 1})
+    return counter["version"] if counter else 0
 
-def get_alternative_slots():
-    """Generates a list of 3 upcoming available slots on future dates."""
-    now = datetime.utcnow()
-    slots = []
-    # Start checking from the next day to avoid suggesting times that are too soon or in the past.
-    check_date = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(
-        days=1
+
+# Sorted in-memory view of booked dates, kept in sync by the write operations below
+slot_index = SlotIndex(
+    Meetings,
+    horizon_days=int(os.getenv("SLOT_SEARCH_HORIZON_DAYS", "30")),
+    ttl_seconds=float(os.getenv("SLOT_INDEX_TTL_SECONDS", "60")),
+    live_filter=live_filter,
+)
+
+
+# Fetch all projects
+async def find_all_projects(projection=None):
+    return await Projects.find({}, projection).to_list()
+
+
+# Fetch single user (first one)
+async def find_user(projection=None):
+    return await Users.find_one({}, projection)  # returns dict or None
+
+
+# Combine them, fetching only the fields the system prompt uses
+async def find_portfolio_data():
+    user, projects = await asyncio.gather(
+        find_user(
+            {
+                "_id": 0,
+                "name": 1,
+                "title": 1,
+                "description": 1,
+                "stack.description": 1,
+            }
+        ),
+        find_all_projects({"_id": 0, "title": 1, "description": 1}),
     )
+    return user, projects
 
-    # Keep searching until we find 3 slots
-    while len(slots) < 3:
-        # Check standard business hours: 10 AM, 2 PM, 4 PM UTC
-        for hour in [10, 14, 16]:
-            potential_slot = check_date.replace(hour=hour)
-            if is_slot_available(potential_slot):
-                # Add 'Z' to indicate UTC time, which is standard for ISO 8601
-                slots.append(potential_slot.isoformat() + "Z")
-                if len(slots) >= 3:
-                    break
-        # Move to the next day
-        check_date += timedelta(days=1)
-    return slots
-
-
-def book_meeting(client_name, client_email, client_project_description, date: datetime):
+
+async def is_slot_available(date: datetime) -> bool:
+    """Checks if a slot is available and is not in the past."""
+    return await slot_index.is_available(date)
+
+
+async def get_alternative_slots():
+    """
+    Generates a list of up to 3 upcoming available slots on future dates,
+    searching no further than the configured horizon.
+    """
+    # Add 'Z' to indicate UTC time, which is standard for ISO 8601
+    return [slot.isoformat() + "Z" for slot in await slot_index.next_free(3)]
+
+
+async def find_free_slots(start: datetime, end: datetime) -> list:
+    """Every free business-hour slot in [start, end) that isn't in the past, from one range query."""
+    start = max(start, datetime.utcnow())
+    booked = await Meetings.find(
+        {"date": {"$gte": start, "$lt": end}, **live_filter()},
+        {"date": 1, "_id": 0},
+    ).to_list()
+    booked = {doc["date"] for doc in booked}
+    return [slot for slot in business_slots(start, end) if slot not in booked]
+
+
+async def _slot_taken() -> SlotTaken:
+    # Another session won the slot, so the cached view is stale; reload it first
+    await slot_index.refresh()
+    return SlotTaken(await get_alternative_slots())
+
+
+async def book_meeting(
+    client_name, client_email, client_project_description, date: datetime
+):
+    """
+    Holds the slot with one atomic upsert keyed on the date: the hold is only
+    inserted if no live meeting or hold has the slot yet. Raises SlotTaken
+    otherwise. The hold expires with its OTP after OTP_TTL_MINUTES.
+    """
     otp = random.randint(1000, 9999)
-    Meetings.insert_one(
-        {
-            "client_name": client_name,
+    now = datetime.utcnow()
+    details = {
+        "client_name": client_name,
+        "client_project_description": client_project_description,
+        "OTP": otp,
+        "otp_attempts": 0,
+        "expiresAt": now + timedelta(minutes=OTP_TTL_MINUTES),
+    }
+    hold = {
+        "$setOnInsert": {
+            **details,
             "client_email": client_email,
-            "client_project_description": client_project_description,
-            "date": date,
             "isCompleted": False,
             "isVerified": False,
-            "OTP": otp,
         }
-    )
+    }
+    for attempt in range(2):
+        try:
+            existing = await Meetings.find_one_and_update(
+                {"date": date, **live_filter(now)},
+                hold,
+                projection={"client_email": 1, "isVerified": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+            break
+        except DuplicateKeyError:
+            if attempt:
+                raise await _slot_taken()
+            # The client's own expired hold on this slot, not reaped yet, blocks
+            # the (client_email, date) index: release it and try once more
+            await Meetings.delete_one(
+                {
+                    "client_email": client_email,
+                    "date": date,
+                    "isVerified": False,
+                    "$or": [
+                        {"expiresAt": {"$lte": now}},
+                        {"expiresAt": {"$exists": False}},
+                    ],
+                }
+            )
+    if existing is None:
+        slot_index.add(date)
+        await _calendar_changed()
+    elif existing["client_email"] == client_email and not existing["isVerified"]:
+        # The client's own unconfirmed hold (e.g. a retry): send a fresh code
+        await Meetings.update_one({"_id": existing["_id"]}, {"$set": details})
+    else:
+        raise await _slot_taken()
 
     # --- Improved Email Content ---
     subject = "Your Verification Code to Confirm Your Meeting with Aryan Baghel"
@@ -96,30 +198,88 @@ To confirm your appointment, please use the following One-Time Password (OTP):
 
 **Your OTP is: {otp}**
 
-Please provide this code to the AI assistant in the chat to finalize your booking. This code is valid for the next 10 minutes.
+Please provide this code to the AI assistant in the chat to finalize your booking. This code is valid for the next {OTP_TTL_MINUTES} minutes.
 
 If you did not request this meeting, please disregard this email.
 
 Best regards,
 Aryan Baghel's AI Assistant
 """
-    send_email(client_email, subject, content)
+    await outbox.enqueue(client_email, subject, content)
     return otp
 
 
-async def verify_meeting(client_email, otp: int) -> bool:
-    meeting = Meetings.find_one({"client_email": client_email, "OTP": otp})
-    if meeting:
-        Meetings.update_one({"_id": meeting["_id"]}, {"$set": {"isVerified": True}})
+async def _release_hold(hold_id, date: datetime):
+    await Meetings.delete_one({"_id": hold_id, "isVerified": False})
+    slot_index.discard(date)
+    await _calendar_changed()
 
-        # --- Email to the Client ---
-        client_name = meeting["client_name"]
-        meeting_date = meeting["date"].strftime("%A, %B %d, %Y")
-        meeting_time = meeting["date"].strftime("%I:%M %p UTC")
-        project_desc = meeting["client_project_description"]
 
-        client_subject = "Your Meeting with Aryan Baghel is Confirmed!"
-        client_content = f"""
+async def verify_meeting(client_email, otp: int) -> dict:
+    """
+    Confirms a live hold in one atomic update and returns {"status": ...}:
+    "confirmed" (with the meeting's "date"), "invalid_otp" (with
+    "attempts_left"), "expired", "too_many_attempts" or "not_found". Expired
+    and locked holds are released.
+
+    The unique index on verified dates rejects the update if another client
+    confirmed the same slot first, in which case the hold is released and
+    SlotTaken is raised.
+    """
+    now = datetime.utcnow()
+    query = {
+        "client_email": client_email,
+        "OTP": otp,
+        "isVerified": False,
+        "expiresAt": {"$gt": now},
+        "otp_attempts": {"$lt": OTP_MAX_ATTEMPTS},
+    }
+    try:
+        meeting = await Meetings.find_one_and_update(
+            query,
+            {
+                "$set": {"isVerified": True},
+                "$unset": {"OTP": "", "expiresAt": "", "otp_attempts": ""},
+            },
+            projection={"client_name": 1, "date": 1, "client_project_description": 1},
+        )
+    except DuplicateKeyError:
+        lost = await Meetings.find_one_and_delete(query, projection={"date": 1})
+        if lost:
+            slot_index.discard(lost["date"])
+            await _calendar_changed()
+        raise await _slot_taken()
+
+    if not meeting:
+        # Wrong, expired or exhausted code: count the attempt on the latest hold
+        hold = await Meetings.find_one_and_update(
+            {"client_email": client_email, "isVerified": False},
+            {"$inc": {"otp_attempts": 1}},
+            projection={"date": 1, "expiresAt": 1, "otp_attempts": 1},
+            sort=[("date", -1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if not hold:
+            return {"status": "not_found"}
+        if not hold.get("expiresAt") or hold["expiresAt"] <= now:
+            await _release_hold(hold["_id"], hold["date"])
+            return {"status": "expired"}
+        if hold["otp_attempts"] >= OTP_MAX_ATTEMPTS:
+            await _release_hold(hold["_id"], hold["date"])
+            return {"status": "too_many_attempts"}
+        return {
+            "status": "invalid_otp",
+            "attempts_left": OTP_MAX_ATTEMPTS - hold["otp_attempts"],
+        }
+
+    # --- Email to the Client ---
+    client_name = meeting["client_name"]
+    meeting_date = meeting["date"].strftime("%A, %B %d, %Y")
+    meeting_time = meeting["date"].strftime("%I:%M %p UTC")
+    project_desc = meeting["client_project_description"]
+
+    client_subject = "Your Meeting with Aryan Baghel is Confirmed!"
+    client_content = f"""
 Hello {client_name},
 
 This email confirms that your meeting with Aryan Baghel has been successfully booked.
@@ -138,11 +298,11 @@ We look forward to speaking with you!
 Best regards,
 Aryan Baghel's AI Assistant
 """
-        send_email(client_email, client_subject, client_content)
+    await outbox.enqueue(client_email, client_subject, client_content)
 
-        # --- Notification Email to Aryan ---
-        aryan_subject = f"✅ New Confirmed Meeting with {client_name}"
-        aryan_content = f"""
+    # --- Notification Email to Aryan ---
+    aryan_subject = f"✅ New Confirmed Meeting with {client_name}"
+    aryan_content = f"""
 Hello Aryan,
 
 A new meeting has been confirmed and added to your schedule.
@@ -158,36 +318,93 @@ Meeting Details:
 
 This has been added to the database.
 """
-        print("Waiting for 2 seconds before sending notification...")
-        await asyncio.sleep(2)
-
-        send_email(os.environ["SMTP_USER"], aryan_subject, aryan_content)
-
-        return True
-    return False
-
-
-def delete_unverified_meeting(client_email: str):
-    Meetings.delete_many({"client_email": client_email, "isVerified": False})
-
-
-def get_client_details(client_email: str):
-    return Meetings.find_one({"client_email": client_email})
-
+    await outbox.enqueue(os.environ["SMTP_USER"], aryan_subject, aryan_content)
+
+    return {"status": "confirmed", "date": meeting["date"].isoformat() + "Z"}
+
+
+async def delete_unverified_meeting(client_email: str):
+    unverified = await Meetings.find(
+        {"client_email": client_email, "isVerified": False}, {"date": 1}
+    ).to_list()
+    if not unverified:
+        return
+    await Meetings.delete_many({"_id": {"$in": [m["_id"] for m in unverified]}})
+    for meeting in unverified:
+        slot_index.discard(meeting["date"])
+    await _calendar_changed()
+
+
+async def reclaim_expired_holds() -> int:
+    """
+    Deletes unverified holds whose OTP expired (and legacy holds that never had
+    an expiry) and frees their slots. Returns how many were reclaimed. The TTL
+    index removes expired holds too, but only about once a minute.
+    """
+    expired = await Meetings.find(
+        {
+            "isVerified": False,
+            "$or": [
+                {"expiresAt": {"$lte": datetime.utcnow()}},
+                {"expiresAt": {"$exists": False}},
+            ],
+        },
+        {"date": 1},
+    ).to_list()
+    if not expired:
+        return 0
+    await Meetings.delete_many(
+        {"_id": {"$in": [m["_id"] for m in expired]}, "isVerified": False}
+    )
+    for meeting in expired:
+        slot_index.discard(meeting["date"])
+    await _calendar_changed()
+    return len(expired)
 
-def is_client_exist(client_email: str):
-    client = Meetings.find_one({"client_email": client_email})
 
-    if not client:
-        return False
-    else:
-        return True
+async def find_client(client_email: str):
+    """Returns the client's latest booking with only the fields the assistant needs."""
+    return await Meetings.find_one(
+        {"client_email": client_email}, CLIENT_FIELDS, sort=[("date", -1)]
+    )
 
 
 async def reschedule(client_email, dt: datetime) -> bool:
-    meeting = Meetings.find_one({"client_email": client_email})
+    """
+    Moves the client's latest confirmed meeting in one atomic update. Raises
+    SlotTaken if the new slot is confirmed for someone else (the unique index
+    on verified dates) or held by a live hold; in the latter case the move is
+    undone. Holds can't be rescheduled, only booked again.
+    """
+    try:
+        # The document from before the update still has the old date
+        meeting = await Meetings.find_one_and_update(
+            {"client_email": client_email, "isVerified": True},
+            {"$set": {"date": dt}},
+            projection={"client_name": 1, "date": 1},
+            sort=[("date", -1)],
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise await _slot_taken()
     if meeting:
-        Meetings.update_one({"_id": meeting["_id"]}, {"$set": {"date": dt}})
+        # Once the meeting sits on the slot no new hold can take it, so a
+        # hold found now was there first and keeps the slot
+        hold = await Meetings.find_one(
+            {
+                "date": dt,
+                "isVerified": False,
+                "expiresAt": {"$gt": datetime.utcnow()},
+            },
+            {"_id": 1},
+        )
+        if hold:
+            await Meetings.update_one(
+                {"_id": meeting["_id"], "date": dt}, {"$set": {"date": meeting["date"]}}
+            )
+            raise await _slot_taken()
+        slot_index.move(meeting["date"], dt)
+        await _calendar_changed()
 
         # --- Email to the Client ---
         client_name = meeting["client_name"]
@@ -211,7 +428,7 @@ If you have any further questions, please feel free to chat with our AI assistan
 Best regards,
 Aryan Baghel's AI Assistant
 """
-        send_email(client_email, client_subject, client_content)
+        await outbox.enqueue(client_email, client_subject, client_content)
 
         # --- Notification Email to Aryan ---
         aryan_subject = f"🔄 Meeting Rescheduled by {client_name}"
@@ -230,10 +447,7 @@ Updated Meeting Details:
 
 The database has been updated.
 """
-        print("Waiting for 2 seconds before sending notification...")
-        await asyncio.sleep(2)
-
-        send_email(os.environ["SMTP_USER"], aryan_subject, aryan_content)
+        await outbox.enqueue(os.environ["SMTP_USER"], aryan_subject, aryan_content)
 
         return True
     return False
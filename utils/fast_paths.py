@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+import os
+import re
+import uuid
+
+from utils.context_window import extract_booking_facts, tool_result
+from utils.metrics import fast_path_total
+
+FAST_PATHS_ENABLED = os.getenv("FAST_PATHS", "true").lower() in ("1", "true", "yes")
+# Name of the custom event the chat controller streams as answer text
+FAST_PATH_EVENT = "fast_path_reply"
+
+# A reply that is nothing but the code, e.g. "4821" or "48 21"
+_OTP_REPLY = re.compile(r"^\s*(\d(?:[\s-]?\d){3})\s*\.?\s*$")
+
+
+@dataclass(frozen=True)
+class FastPath:
+    """
+    A step the graph can take without asking the model.
+
+    `match(text, facts)` returns the tool arguments when the latest user
+    message unambiguously asks for this step, else None. `reply(result,
+    facts)` turns the tool result into the answer, or returns None to let
+    the agent phrase it.
+    """
+
+    name: str
+    tool: str
+    match: Callable
+    reply: Callable
+
+
+# ✅ --- OTP Verification ---
+def _match_otp(text: str, facts: dict):
+    if facts.get("stage") != "awaiting_otp" or not facts.get("client_email"):
+        return None
+    found = _OTP_REPLY.match(text)
+    if not found:
+        return None
+    return {"client_email": facts["client_email"], "otp": int(re.sub(r"\D", "", found.group(1)))}
+
+
+def _format_slot(value) -> str:
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%A, %B %d at %H:%M UTC")
+    except ValueError:
+        return str(value)
+
+
+def _reply_otp(result: dict, facts: dict):
+    status = result.get("status")
+    if status == "confirmed":
+        # The date comes from the confirmed meeting itself, never from earlier turns
+        when = f" on {_format_slot(result['date'])}" if result.get("date") else ""
+        return (
+            f"You're all set! Your meeting{when} is confirmed and a confirmation "
+            f"email is on its way to {facts['client_email']}."
+        )
+    if status == "invalid_otp":
+        return f"That code doesn't match. {result['message']} Please check the email and try again."
+    if status in ("expired", "too_many_attempts"):
+        return f"{result['message']} Would you like me to book it again and send a new code?"
+    # Taken slots and missing bookings need the agent to suggest a way forward
+    return None
+
+
+# Checked in order; the first match wins
+FAST_PATHS = [
+    FastPath(name="otp", tool="verify_meeting", match=_match_otp, reply=_reply_otp),
+]
+
+
+class FastPathRouter:
+    """
+    Graph node in front of the agent that answers deterministic turns itself.
+
+    When a registered fast path matches the latest user message, the router
+    calls the tool through the tool executor (same timeouts, metrics and
+    tracing) and records the exchange in history as if the model had made
+    the call: an AI tool call, its result and the templated answer. The
+    answer is streamed as a custom event. Anything ambiguous is left to the
+    agent untouched.
+    """
+
+    def __init__(self, executor, paths: list = None, enabled: bool = FAST_PATHS_ENABLED):
+        self.executor = executor
+        self.paths = FAST_PATHS if paths is None else paths
+        self.enabled = enabled
+
+    async def __call__(self, state, config: RunnableConfig):
+        messages = state["messages"]
+        if not self.enabled or not messages or not isinstance(messages[-1], HumanMessage):
+            return {"messages": []}
+        text = messages[-1].content if isinstance(messages[-1].content, str) else ""
+        facts = extract_booking_facts(messages)
+        for path in self.paths:
+            args = path.match(text, facts)
+            if args is not None:
+                return await self._take(path, args, facts, config)
+        return {"messages": []}
+
+    async def _take(self, path: FastPath, args: dict, facts: dict, config: RunnableConfig):
+        call = {"name": path.tool, "args": args, "id": f"fast_{uuid.uuid4().hex[:12]}"}
+        result = await self.executor.run_call(call, config)
+        messages = [AIMessage(content="", tool_calls=[call]), result]
+        answer = None
+        if result.status != "error":
+            answer = path.reply(tool_result(result), facts)
+        if answer is None:
+            # The tool already ran; the agent only has to phrase its result
+            fast_path_total.inc(path=path.name, outcome="handed_off")
+            return {"messages": messages}
+        fast_path_total.inc(path=path.name, outcome="answered")
+        await adispatch_custom_event(FAST_PATH_EVENT, {"text": answer}, config=config)
+        return {"messages": [*messages, AIMessage(content=answer)]}
+
+
+def route_after_fast_path(state) -> str:
+    """Ends the turn when the router answered it, otherwise hands over to the agent."""
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return "end"
+    return "agent"
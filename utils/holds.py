@@ -0,0 +1,45 @@
+from utils.database_operations import reclaim_expired_holds
+import asyncio
+import logging
+import os
+
+
+class HoldReaper:
+    """
+    Background task that reclaims expired booking holds every
+    `interval_seconds`, so abandoned chats stop blocking their slots and the
+    slot index only ever contains live meetings.
+    """
+
+    def __init__(self, interval_seconds: float = 30):
+        self.interval_seconds = interval_seconds
+        self.reclaimed = 0
+        self._task = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(interval_seconds=float(os.getenv("HOLD_REAP_INTERVAL_SECONDS", "30")))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                count = await reclaim_expired_holds()
+                if count:
+                    self.reclaimed += count
+                    logging.info(f"🧹 Reclaimed {count} expired booking holds")
+            except Exception as e:
+                logging.error(f"❌ Hold reclamation failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,66 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+# ✅ --- Managed Indexes ---
+# Every hot query in database_operations, slot_index and the outbox is served
+# by one of these. Names are left to MongoDB's defaults so existing indexes
+# with the same keys are recognised instead of conflicting.
+INDEXES = {
+    "meetings": [
+        # Client lookups, newest booking first (find_client, reschedule).
+        # Unique, so a client can't hold the same slot twice.
+        IndexModel([("client_email", ASCENDING), ("date", DESCENDING)], unique=True),
+        # OTP verification
+        IndexModel([("client_email", ASCENDING), ("OTP", ASCENDING)]),
+        # Slot availability and the slot index's range query
+        IndexModel([("date", ASCENDING), ("isVerified", ASCENDING)]),
+        # At most one confirmed meeting per slot, whatever races happen above it
+        IndexModel(
+            [("date", ASCENDING)],
+            name="date_verified_unique",
+            unique=True,
+            partialFilterExpression={"isVerified": True},
+        ),
+        # Expired OTP holds are deleted by MongoDB; the hold reaper frees
+        # their slots sooner. Verification unsets expiresAt.
+        IndexModel(
+            [("expiresAt", ASCENDING)],
+            expireAfterSeconds=0,
+            partialFilterExpression={"isVerified": False},
+        ),
+    ],
+    "outbox": [
+        # Due messages in creation order
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes(database, indexes: dict = INDEXES) -> dict:
+    """
+    Creates any missing managed index. Creating an index that already exists is
+    a no-op, so this is safe on every startup. Each index is created on its
+    own, so a conflict (e.g. duplicates that block a unique index) is logged
+    and skips only that index; the slot and expiry guarantees never depend on
+    it. Indexes that aren't managed here are reported but never dropped.
+    """
+    created = {}
+    for name, models in indexes.items():
+        collection = database[name]
+        created[name] = []
+        for model in models:
+            try:
+                created[name] += await collection.create_indexes([model])
+            except OperationFailure as e:
+                logging.error(
+                    f"❌ Could not create index {model.document['name']} on {name}: {e}"
+                )
+
+        managed = set(created[name]) | {"_id_"}
+        existing = [index["name"] async for index in await collection.list_indexes()]
+        unmanaged = [index for index in existing if index not in managed]
+        if unmanaged:
+            logging.info(f"ℹ️ Unmanaged indexes on {name}: {', '.join(unmanaged)}")
+    logging.info(f"✅ Indexes ensured on {', '.join(created)}")
+    return created
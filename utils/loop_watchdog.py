@@ -0,0 +1,140 @@
+from collections import Counter
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+from utils.metrics import loop_blocked, loop_lag
+
+_TRUE = ("1", "true", "yes")
+LOOP_WATCHDOG = os.getenv("LOOP_WATCHDOG", "false").lower() in _TRUE
+
+# Frames from these files are the service's own code; everything else is a library
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_project_file(filename: str) -> bool:
+    return filename.startswith(_PROJECT_ROOT) and "site-packages" not in filename
+
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    if filename.startswith("<"):
+        # Frozen stdlib modules, e.g. "<frozen importlib._bootstrap>"
+        module = filename.strip("<>").split()[-1]
+    else:
+        module = os.path.splitext(os.path.basename(filename))[0]
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class LoopWatchdog:
+    """
+    Opt-in monitor for anything that blocks the event loop.
+
+    A heartbeat task sleeps `interval` seconds at a time and records how late
+    it wakes up in a lag histogram. A daemon thread watches the heartbeat;
+    once the loop has been stuck for `threshold` seconds it samples the loop
+    thread's stack while the blocking call is still running, logs the
+    innermost frames and counts the innermost frame from the service's own
+    code (e.g. `send_mail.SMTPSession.send`) as the blocking site.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, max_frames: int = 6):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_frames = max_frames
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.sites = Counter()
+        self._beat = 0
+        self._last_beat = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            interval=float(os.getenv("LOOP_WATCHDOG_INTERVAL_MS", "100")) / 1000,
+            threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000,
+        )
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logging.info(
+            f"🐕 Loop watchdog started (lag threshold {self.threshold * 1000:.0f} ms)"
+        )
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        self._task = None
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            self._beat += 1
+            self._last_beat = start
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - start - self.interval, 0.0)
+            loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                logging.warning(f"🐢 Event loop lagged {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        sampled = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat, last_beat = self._beat, self._last_beat
+            stuck = time.monotonic() - last_beat - self.interval
+            # One sample per stall, taken while the blocking call is still on the stack
+            if stuck >= self.threshold and beat != sampled:
+                sampled = beat
+                self._sample(stuck)
+
+    def _sample(self, stuck: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        site = next(
+            (_frame_name(f.f_code) for f in stack if _is_project_file(f.f_code.co_filename)),
+            _frame_name(stack[0].f_code),
+        )
+        self.sites[site] += 1
+        loop_blocked.inc(site=site)
+        frames = " ← ".join(
+            f"{_frame_name(f.f_code)}:{f.f_lineno}" for f in stack[: self.max_frames]
+        )
+        logging.warning(
+            f"🐢 Event loop blocked for {stuck * 1000:.0f} ms+ in {site}\n    {frames}"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "sampled_sites": sum(self.sites.values()),
+        }
@@ -2,18 +2,28 @@
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 from datetime import datetime
+import asyncio
+from utils.validate_email import is_valid_email
 from utils.database_operations import (
+    find_client,
     is_slot_available,
     get_alternative_slots,
     book_meeting,
     verify_meeting,
     delete_unverified_meeting,
-    get_client_details,
-    is_client_exist,
     reschedule,
+    SlotTaken,
 )
 
 
+def _slot_taken_result(error: SlotTaken) -> dict:
+    return {
+        "status": "slot_taken",
+        "message": "Sorry, that slot was just taken by someone else.",
+        "suggestions": error.alternatives,
+    }
+
+
 class CheckSlotInput(BaseModel):
     """Input for the check_slot_availability tool."""
 
@@ -23,17 +33,17 @@ class CheckSlotInput(BaseModel):
 
 
 @tool("check_slot_availability", args_schema=CheckSlotInput)
-def check_slot_availability(datetime_str: str):
+async def check_slot_availability(datetime_str: str):
     """
     Checks if a specific date and time slot is available for a meeting.
     The AI must first determine the current time to correctly interpret user requests like 'tomorrow'.
     """
     try:
         dt = datetime.fromisoformat(datetime_str)
-        if is_slot_available(dt):
+        if await is_slot_available(dt):
             return {"available": True, "slot": datetime_str}
         else:
-            return {"available": False, "suggestions": get_alternative_slots()}
+            return {"available": False, "suggestions": await get_alternative_slots()}
     except ValueError:
         return {
             "error": "Invalid datetime format. The AI must provide a string in YYYY-MM-DDTHH:MM:SS format."
@@ -58,7 +68,7 @@ class BookMeetingInput(BaseModel):
 
 
 @tool("book_meeting", args_schema=BookMeetingInput)
-def book_meeting_tool(
+async def book_meeting_tool(
     client_name: str,
     client_email: str,
     client_project_description: str,
@@ -70,11 +80,13 @@ def book_meeting_tool(
     """
     try:
         dt = datetime.fromisoformat(datetime_str)
-        book_meeting(client_name, client_email, client_project_description, dt)
+        await book_meeting(client_name, client_email, client_project_description, dt)
         return {
             "status": "tentative",
             "message": f"A verification OTP has been sent to {client_email}.",
         }
+    except SlotTaken as e:
+        return _slot_taken_result(e)
     except ValueError:
         return {
             "error": "Invalid datetime format. The AI must provide a string in YYYY-MM-DDTHH:MM:SS format."
@@ -90,18 +102,23 @@ class VerifyMeetingInput(BaseModel):
     otp: int = Field(description="The One-Time Password (OTP) provided by the user.")
 
 
+VERIFY_MESSAGES = {
+    "confirmed": "Your meeting has been confirmed successfully!",
+    "invalid_otp": "The OTP provided is incorrect. {attempts_left} attempts left.",
+    "expired": "The code has expired and the slot was released. The meeting must be booked again.",
+    "too_many_attempts": "Too many incorrect codes, the slot was released. The meeting must be booked again.",
+    "not_found": "There is no pending booking for this email.",
+}
+
+
 @tool("verify_meeting", args_schema=VerifyMeetingInput)
 async def verify_meeting_tool(client_email: str, otp: int):
     """Verifies a booked meeting using the OTP sent to the user's email."""
-    if await verify_meeting(client_email, otp):
-        return {
-            "status": "confirmed",
-            "message": "Your meeting has been confirmed successfully!",
-        }
-    return {
-        "status": "failed",
-        "message": "The OTP provided is incorrect. Please try again.",
-    }
+    try:
+        result = await verify_meeting(client_email, otp)
+    except SlotTaken as e:
+        return _slot_taken_result(e)
+    return {**result, "message": VERIFY_MESSAGES[result["status"]].format(**result)}
 
 
 class DeclineMeetingInput(BaseModel):
@@ -113,58 +130,44 @@ class DeclineMeetingInput(BaseModel):
 
 
 @tool("decline_meeting", args_schema=DeclineMeetingInput)
-def decline_meeting_tool(client_email: str):
+async def decline_meeting_tool(client_email: str):
     """Cancels a meeting that has not yet been verified by OTP."""
-    delete_unverified_meeting(client_email)
+    await delete_unverified_meeting(client_email)
     return {
         "status": "declined",
         "message": "The meeting has been cancelled as requested.",
     }
 
 
-class GetClientDetailsInput(BaseModel):
-    """Input for the get_client_details."""
+class LookupClientInput(BaseModel):
+    """Input for the lookup_client tool."""
 
-    client_email: str = Field(
-        description="The email of the user to get all there details"
-    )
+    client_email: str = Field(description="The email address the user provided.")
 
 
-@tool("get_client_details", args_schema=GetClientDetailsInput)
-def get_client_details_tool(client_email: str):
-    """Get all the information of the user based on there email"""
-    client = get_client_details(client_email)
+@tool("lookup_client", args_schema=LookupClientInput)
+async def lookup_client_tool(client_email: str):
+    """
+    Validates the user's email and, in the same call, checks whether they are a
+    returning client and returns their details (name, project, meeting date).
+    """
+    # Email validation may do a DNS lookup, keep it off the event loop
+    if not await asyncio.to_thread(is_valid_email, client_email):
+        return {"valid_email": False, "message": "Email is not valid"}
 
+    client = await find_client(client_email)
     if not client:
-        return {"success": False, "message": "User not found"}
-    return {
-        "success": True,
-        "message": "User retrieved successfully",
-        "user_info": client,
-    }
-
-
-class IsUserExistInput(BaseModel):
-    """Input for the is_user_exist."""
+        return {"valid_email": True, "exists": False, "message": "User not found"}
 
-    client_email: str = Field(
-        description="The email of the user to check whether they exist or not"
-    )
-
-
-@tool("is_user_exist", args_schema=IsUserExistInput)
-def is_user_exist_tool(client_email: str):
-    """Check where the user already exist and have booked a meeting"""
-    exist = is_client_exist(client_email)
-
-    if not exist:
-        return {"success": False, "message": "User not found"}
+    if client.get("date"):
+        client["date"] = client["date"].isoformat() + "Z"
     return {
-        "success": True,
+        "valid_email": True,
+        "exists": True,
         "message": "User found",
+        "client": client,
     }
 
-
 class RescheduleInput(BaseModel):
     """Input for the reschedule."""
 
@@ -189,8 +192,10 @@ async def reschedule_tool(client_email: str, datetime_str: str):
             }
         return {
             "status": "failed",
-            "message": "Something went wrong. Please try again.",
+            "message": "There is no confirmed meeting for this email to reschedule.",
         }
+    except SlotTaken as e:
+        return _slot_taken_result(e)
     except ValueError:
         return {
             "error": "Invalid datetime format. The AI must provide a string in YYYY-MM-DDTHH:MM:SS format."
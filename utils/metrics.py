@@ -0,0 +1,384 @@
+from contextlib import contextmanager
+from pymongo import monitoring
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+# Latency buckets in seconds, from sub-millisecond Mongo reads to long LLM streams
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.label_names)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(k, (list(c), s, n)) for k, (c, s, n) in self._values.items()]
+        lines = self.header()
+        names = self.label_names + ("le",)
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Keeps the service's metrics and renders them in the Prometheus text format.
+
+    Histograms and counters are recorded in place. Components that already
+    keep their own stats (admission control, the answer cache, checkpoint
+    maintenance) are registered as collectors and read at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, name: str, collect):
+        """`collect()` returns {metric_name: (type, help, {labels_tuple_or_(): value})}."""
+        self._collectors[name] = collect
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, collect in self._collectors.items():
+            try:
+                collected = collect()
+            except Exception as e:
+                logging.error(f"❌ Metrics collector {name} failed: {e}")
+                continue
+            for metric_name, (kind, help, samples) in collected.items():
+                lines.append(f"# HELP {metric_name} {help}")
+                lines.append(f"# TYPE {metric_name} {kind}")
+                for labels, value in samples.items():
+                    label_text = _labels([n for n, _ in labels], [v for _, v in labels])
+                    lines.append(f"{metric_name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def percentile(values, pct: float):
+    """Nearest-rank percentile of `values` (in any order), or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def latency_stats(prefix: str, seconds) -> dict:
+    """p50, p95 and max of recent latencies in seconds, as `{prefix}_p50_ms` and so on."""
+    values = list(seconds)
+    return {
+        f"{prefix}_{name}_ms": round(percentile(values, pct) * 1000, 2) if values else 0.0
+        for name, pct in (("p50", 0.5), ("p95", 0.95), ("max", 1.0))
+    }
+
+
+def stats_gauges(prefix: str, stats: dict, label_names: dict = None) -> dict:
+    """
+    Turns a component's `stats()` dict into collector output: numbers become
+    gauges, and nested dicts named in `label_names` become one labelled gauge.
+    """
+    label_names = label_names or {}
+    collected = {}
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict) and key in label_names:
+            samples = {
+                ((label_names[key], k),): v
+                for k, v in value.items()
+                if isinstance(v, (int, float))
+            }
+            collected[name] = ("gauge", f"{prefix} {key} by {label_names[key]}.", samples)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            collected[name] = ("gauge", f"{prefix} {key}.", {(): value})
+    return collected
+
+
+# Global registry, exposed on /metrics
+metrics = MetricsRegistry()
+
+time_to_first_token = metrics.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from receiving a chat message to streaming the first answer frame.",
+    labels=("source",),
+)
+stream_duration = metrics.histogram(
+    "chat_stream_duration_seconds",
+    "Total duration of a chat stream.",
+    labels=("outcome",),
+)
+node_duration = metrics.histogram(
+    "graph_node_duration_seconds", "Duration of each graph node run.", labels=("node",)
+)
+tool_duration = metrics.histogram(
+    "tool_duration_seconds", "Duration of each tool call.", labels=("tool", "status")
+)
+checkpoint_duration = metrics.histogram(
+    "checkpoint_operation_duration_seconds",
+    "Latency of checkpoint reads and writes.",
+    labels=("operation",),
+)
+mongo_duration = metrics.histogram(
+    "mongo_command_duration_seconds",
+    "Latency of MongoDB commands.",
+    labels=("command", "collection", "status"),
+)
+smtp_duration = metrics.histogram(
+    "smtp_send_duration_seconds", "Latency of sending one email.", labels=("status",)
+)
+tool_memo_hits = metrics.counter(
+    "tool_memo_hits_total", "Tool calls answered from the per-run memo.", labels=("tool",)
+)
+tool_memo_saved = metrics.histogram(
+    "tool_memo_saved_db_calls",
+    "Database calls the per-run tool memo saved in one chat turn.",
+    buckets=(0, 1, 2, 3, 5, 10, 20),
+)
+loop_lag = metrics.histogram(
+    "event_loop_lag_seconds",
+    "How late the loop watchdog's heartbeat woke up.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+loop_blocked = metrics.counter(
+    "event_loop_blocked_total",
+    "Stalls of the event loop, by the innermost service frame on the loop thread.",
+    labels=("site",),
+)
+fast_path_total = metrics.counter(
+    "chat_fast_path_total",
+    "Turns the fast path router took without a model call, or handed to the agent.",
+    labels=("path", "outcome"),
+)
+
+
+# ✅ --- MongoDB Command Listener ---
+# Commands issued by the current task (and tasks it starts), when someone is counting
+_mongo_commands = contextvars.ContextVar("mongo_commands", default=None)
+
+
+@contextmanager
+def count_mongo_commands():
+    """Counts the MongoDB commands issued inside the block; read `counter[0]` afterwards."""
+    counter = [0]
+    token = _mongo_commands.set(counter)
+    try:
+        yield counter
+    finally:
+        _mongo_commands.reset(token)
+
+
+@contextmanager
+def uncounted_mongo_commands():
+    """
+    Leaves the block's commands out of any enclosing count_mongo_commands(),
+    for work whose result outlives the call that triggered it (e.g. reloading
+    the slot index), so reusing that call's result doesn't claim to save it.
+    """
+    token = _mongo_commands.set(None)
+    try:
+        yield
+    finally:
+        _mongo_commands.reset(token)
+
+
+def record_mongo_command():
+    counter = _mongo_commands.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Records the latency of every MongoDB command pymongo sends."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        record_mongo_command()
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _record(self, event, status: str):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        mongo_duration.observe(
+            event.duration_micros / 1e6,
+            command=event.command_name,
+            collection=collection,
+            status=status,
+        )
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+
+# ✅ --- Trace Spans ---
+TRACE_SPANS = os.getenv("TRACE_SPANS", "false").lower() in ("1", "true", "yes")
+
+_parent_span = contextvars.ContextVar("parent_span", default=None)
+
+
+class Tracer:
+    """
+    Emits one JSON log line per span when TRACE_SPANS is enabled.
+
+    Every span carries the thread_id and the trace_id of the chat turn, both
+    read from the run config, so a slow turn can be pulled out of the logs by
+    either id. Nested spans record their parent's span_id.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.logger = logging.getLogger("trace")
+
+    def new_trace_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def root_span_id(self, trace_id):
+        return trace_id[:16] if trace_id else None
+
+    def emit(self, name: str, thread_id, trace_id, start: float, duration: float, **attrs):
+        if not self.enabled:
+            return
+        span = {
+            "name": name,
+            "thread_id": thread_id,
+            "trace_id": trace_id,
+            "start": round(start, 6),
+            "duration_ms": round(duration * 1000, 3),
+            **attrs,
+        }
+        self.logger.info(json.dumps(span, default=str))
+
+    @contextmanager
+    def span(self, name: str, config: dict = None, **attrs):
+        if not self.enabled:
+            yield
+            return
+        configurable = (config or {}).get("configurable", {})
+        trace_id = configurable.get("trace_id")
+        span_id = uuid.uuid4().hex[:16]
+        token = _parent_span.set(span_id)
+        start_wall, start = time.time(), time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            _parent_span.reset(token)
+            self.emit(
+                name,
+                configurable.get("thread_id"),
+                trace_id,
+                start_wall,
+                time.perf_counter() - start,
+                span_id=span_id,
+                # Top-level spans hang off the turn's root span
+                parent_id=_parent_span.get() or self.root_span_id(trace_id),
+                status=status,
+                **attrs,
+            )
+
+
+tracer = Tracer(enabled=TRACE_SPANS)
+
+
+def timed_node(name: str, node):
+    """Wraps a graph node so each run is timed and traced."""
+
+    async def run(state, config):
+        with node_duration.time(node=name), tracer.span(f"node.{name}", config):
+            return await node(state, config)
+
+    return run
@@ -0,0 +1,202 @@
+from config.db import db
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from utils.metrics import smtp_duration
+from utils.send_mail import SMTPSession
+import asyncio
+import logging
+import os
+import random
+import time
+
+
+class Outbox:
+    """
+    Persistent email outbox.
+
+    Messages are stored in MongoDB by `enqueue` and delivered by a background
+    worker that keeps one authenticated SMTP session open. Each pass sends a
+    batch of due messages, failed sends are retried with exponential backoff,
+    and messages for the same recipient are always delivered in order.
+    """
+
+    def __init__(
+        self,
+        collection_name: str = "outbox",
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        base_backoff: float = 5,
+        max_backoff: float = 600,
+        poll_interval: float = 10,
+        lease_seconds: float = 120,
+        idle_close_seconds: float = 60,
+        session_factory=SMTPSession.from_env,
+    ):
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self.session_factory = session_factory
+        self._session = None
+        self._last_used = 0.0
+        self._wake = asyncio.Event()
+        self._task = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "20")),
+            max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5")),
+            base_backoff=float(os.getenv("OUTBOX_BASE_BACKOFF_SECONDS", "5")),
+            poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "10")),
+        )
+
+    @property
+    def collection(self):
+        return db.get_database()[self.collection_name]
+
+    async def enqueue(self, to: str, subject: str, content: str):
+        """Stores a message for delivery and returns immediately."""
+        now = datetime.utcnow()
+        result = await self.collection.insert_one(
+            {
+                "to": to,
+                "subject": subject,
+                "content": content,
+                "status": "pending",
+                "attempts": 0,
+                "created_at": now,
+                "next_attempt_at": now,
+            }
+        )
+        self._wake.set()
+        return result.inserted_id
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_session()
+
+    async def _run(self):
+        # The (status, created_at) index is managed by utils/indexes.py
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception as e:
+                logging.error(f"❌ Outbox worker error: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            idle_for = asyncio.get_running_loop().time() - self._last_used
+            if self._session is not None and idle_for >= self.idle_close_seconds:
+                # Nothing was sent for a while, don't hold the SMTP session open
+                await self._close_session()
+
+    async def process_batch(self) -> int:
+        """Delivers up to `batch_size` due messages. Returns how many were attempted."""
+        now = datetime.utcnow()
+        candidates = await (
+            self.collection.find(
+                {"status": {"$in": ["pending", "sending"]}},
+                # The body is only needed once a message is claimed
+                {"to": 1, "status": 1, "lease_until": 1, "next_attempt_at": 1},
+            )
+            .sort("created_at", ASCENDING)
+            .limit(self.batch_size * 5)
+            .to_list()
+        )
+
+        processed = 0
+        blocked = set()  # Recipients with an earlier message that isn't sent yet
+        for message in candidates:
+            if processed >= self.batch_size:
+                break
+            to = message["to"]
+            if to in blocked:
+                continue
+            in_flight = message["status"] == "sending" and message["lease_until"] > now
+            if in_flight or message["next_attempt_at"] > now:
+                blocked.add(to)
+                continue
+
+            claimed = await self.collection.find_one_and_update(
+                {"_id": message["_id"], "status": message["status"]},
+                {
+                    "$set": {
+                        "status": "sending",
+                        "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    }
+                },
+                return_document=ReturnDocument.AFTER,
+            )
+            if not claimed:
+                # Another worker picked it up, keep later messages for this recipient waiting
+                blocked.add(to)
+                continue
+
+            processed += 1
+            if not await self._deliver(claimed):
+                blocked.add(to)
+        return processed
+
+    async def _deliver(self, message) -> bool:
+        start = time.perf_counter()
+        try:
+            if self._session is None:
+                self._session = self.session_factory()
+            await asyncio.to_thread(
+                self._session.send, message["to"], message["subject"], message["content"]
+            )
+            smtp_duration.observe(time.perf_counter() - start, status="ok")
+            self._last_used = asyncio.get_running_loop().time()
+        except Exception as e:
+            smtp_duration.observe(time.perf_counter() - start, status="error")
+            await self._close_session()
+            attempts = message["attempts"] + 1
+            if attempts >= self.max_attempts:
+                logging.error(
+                    f"❌ Giving up on email to {message['to']} after {attempts} attempts: {e}"
+                )
+                update = {"status": "failed", "attempts": attempts, "last_error": str(e)}
+            else:
+                delay = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+                delay *= random.uniform(0.8, 1.2)
+                update = {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": str(e),
+                    "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                }
+            await self.collection.update_one({"_id": message["_id"]}, {"$set": update})
+            return False
+
+        await self.collection.delete_one({"_id": message["_id"]})
+        return True
+
+    async def _close_session(self):
+        if self._session is not None:
+            session, self._session = self._session, None
+            await asyncio.to_thread(session.close)
+
+
+# Global outbox used by the meeting operations
+outbox = Outbox.from_env()
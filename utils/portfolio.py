@@ -0,0 +1,105 @@
+from config.db import db
+from dataclasses import dataclass
+from datetime import datetime
+from utils.database_operations import find_portfolio_data
+import asyncio
+import hashlib
+import json
+import logging
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """An immutable, versioned view of the portfolio, the prompt compiled from it and its search index."""
+
+    version: str
+    prompt: str
+    loaded_at: datetime
+    index: object = None
+
+
+class PortfolioCache:
+    """
+    Holds the current PortfolioSnapshot and refreshes it without a restart.
+
+    The snapshot is reloaded in the background once it is older than
+    `ttl_seconds`, or immediately when a change stream reports a write to the
+    users or projects collections. A refresh builds a complete new snapshot
+    and swaps the reference in one assignment, so a request that pinned the
+    previous snapshot keeps seeing consistent data until it finishes.
+    """
+
+    def __init__(
+        self, render, loader=find_portfolio_data, ttl_seconds: float = 300, build_index=None
+    ):
+        self.render = render
+        self.build_index = build_index
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._snapshot = None
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+        self._watch_task = None
+
+    async def get(self) -> PortfolioSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.refresh()
+        age = (datetime.utcnow() - snapshot.loaded_at).total_seconds()
+        if age > self.ttl_seconds:
+            # Serve the current snapshot while a fresh one loads
+            self._schedule_refresh()
+        return snapshot
+
+    async def refresh(self) -> PortfolioSnapshot:
+        async with self._lock:
+            user, projects = await self.loader()
+            prompt = self.render(user, projects)
+            index = self.build_index(user, projects) if self.build_index else None
+            # The prompt only summarizes the portfolio, so the version covers the data too
+            data = json.dumps([user, projects], sort_keys=True, default=str)
+            version = hashlib.sha256((prompt + data).encode()).hexdigest()[:16]
+            previous = self._snapshot
+            self._snapshot = PortfolioSnapshot(
+                version=version, prompt=prompt, loaded_at=datetime.utcnow(), index=index
+            )
+            if previous is not None and previous.version != version:
+                logging.info(f"🔄 Portfolio context updated to version {version}")
+            return self._snapshot
+
+    def invalidate(self):
+        """Change notification hook: reload the snapshot as soon as possible."""
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    def start(self):
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        for task in (self._watch_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._watch_task = None
+        self._refresh_task = None
+
+    async def _watch(self):
+        """Listens for portfolio writes. Change streams need a replica set, so this is best effort."""
+        pipeline = [{"$match": {"ns.coll": {"$in": ["users", "projects"]}}}]
+        try:
+            async with await db.get_database().watch(pipeline) as stream:
+                async for _ in stream:
+                    self.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(
+                f"⚠️ Portfolio change stream unavailable, relying on the TTL refresh: {e}"
+            )
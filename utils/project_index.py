@@ -0,0 +1,123 @@
+from collections import Counter
+import math
+import os
+import re
+
+# How many portfolio entries are injected into each prompt
+PROJECT_TOP_K = int(os.getenv("PROJECT_TOP_K", "4"))
+# Size caps that keep the prompt the same size however large the portfolio is
+SUMMARY_TITLES = 8
+SUMMARY_STACK = 10
+TITLE_CHARS = 80
+DESCRIPTION_CHARS = 400
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can did do does for from has have he him his how i in "
+    "is it its me my of on or so that the their them this to was what which who why "
+    "will with you your about any tell more show".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+class ProjectIndex:
+    """
+    BM25 index over the portfolio's projects and stack entries.
+
+    Built once per portfolio snapshot; `search` ranks entries against the
+    current turn so only the relevant ones go into the prompt. Titles are
+    weighted double. Stack entries are also found by generic words like
+    "stack" or "skills".
+    """
+
+    def __init__(self, entries: list, k1: float = 1.5, b: float = 0.75):
+        self.entries = entries
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = []
+        for i, entry in enumerate(entries):
+            terms = tokenize(entry["title"]) * 2 + tokenize(entry["description"])
+            if entry["kind"] == "stack":
+                terms += ["stack", "skills", "technologies", "tools"]
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, []).append((i, count))
+        self._average_length = sum(self._lengths) / len(self._lengths) if entries else 0
+        self._idf = {
+            term: math.log(1 + (len(entries) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    @classmethod
+    def from_portfolio(cls, user, projects):
+        entries = [
+            {
+                "kind": "project",
+                "title": p.get("title", "Untitled"),
+                "description": p.get("description", ""),
+            }
+            for p in projects or []
+        ]
+        entries += [
+            {"kind": "stack", "title": item.get("description", ""), "description": ""}
+            for item in (user or {}).get("stack", [])
+        ]
+        return cls(entries)
+
+    def search(self, text: str, k: int = PROJECT_TOP_K) -> list:
+        """The `k` best matching entries, best first. Entries matching no term are left out."""
+        scores = {}
+        for term in set(tokenize(text)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._average_length)
+                scores[i] = scores.get(i, 0) + idf * count * (self.k1 + 1) / (count + norm)
+        best = sorted(scores, key=lambda i: (-scores[i], i))[:k]
+        return [self.entries[i] for i in best]
+
+
+def _listing(items: list, limit: int) -> str:
+    more = f" and {len(items) - limit} more" if len(items) > limit else ""
+    return ", ".join(items[:limit]) + more
+
+
+def portfolio_summary(user, projects) -> str:
+    """A fixed-size overview: the project count, a few titles and the main stack."""
+    projects = projects or []
+    summary = "No projects found in the database."
+    if projects:
+        titles = [_clip(p.get("title", "Untitled"), TITLE_CHARS) for p in projects]
+        summary = f"{len(projects)} projects, including {_listing(titles, SUMMARY_TITLES)}."
+    stack = [
+        _clip(item.get("description", "N/A"), TITLE_CHARS)
+        for item in (user or {}).get("stack", [])
+    ]
+    if stack:
+        summary += f"\nMain stack: {_listing(stack, SUMMARY_STACK)}."
+    return summary
+
+
+def format_relevant_projects(entries: list) -> str:
+    if not entries:
+        return ""
+    lines = []
+    for entry in entries:
+        if entry["kind"] == "stack":
+            lines.append(f"- Stack: {_clip(entry['title'], TITLE_CHARS)}")
+        else:
+            lines.append(
+                f"- {_clip(entry['title'], TITLE_CHARS)}: "
+                f"{_clip(entry['description'], DESCRIPTION_CHARS) or 'No description'}"
+            )
+    return "\n\n**Portfolio entries relevant to this conversation:**\n" + "\n".join(lines)
@@ -0,0 +1,134 @@
+from config.db import db
+from utils.metrics import metrics, stats_gauges
+from utils.admission import admission
+from utils.answer_cache import answer_cache
+from utils.thread_turns import thread_turns
+import asyncio
+import importlib
+import logging
+import os
+import time
+
+_TRUE = ("1", "true", "yes")
+
+
+class Runtime:
+    """
+    Owns the service's long-lived resources: the MongoDB connection, the
+    checkpoint database, the compiled graph and the background workers.
+
+    In eager mode everything is built during startup. In lazy mode (for
+    serverless cold starts) nothing heavy is imported or built until the
+    first request asks for the graph; with `prewarm` the build starts in
+    the background right after startup and the first request waits for it.
+    """
+
+    def __init__(self, checkpoint_path: str, lazy: bool = False, prewarm: bool = True):
+        self.checkpoint_path = checkpoint_path
+        self.lazy = lazy
+        self.prewarm = prewarm
+        self.chat_app = None
+        self.checkpointer = None
+        self.maintainer = None
+        self.hold_reaper = None
+        self.portfolio_cache = None
+        self.build_seconds = None
+        self._lock = asyncio.Lock()
+        self._prewarm_task = None
+
+    @classmethod
+    def from_env(cls, checkpoint_path: str):
+        return cls(
+            checkpoint_path,
+            lazy=os.getenv("LAZY_INIT", "false").lower() in _TRUE,
+            prewarm=os.getenv("PREWARM", "true").lower() in _TRUE,
+        )
+
+    async def start(self):
+        if not self.lazy:
+            await self.get_chat_app()
+        elif self.prewarm:
+            self._prewarm_task = asyncio.create_task(self.get_chat_app())
+
+    async def get_chat_app(self):
+        """Returns the compiled graph, building it on first use."""
+        if self.chat_app is None:
+            async with self._lock:
+                if self.chat_app is None:
+                    await self._build()
+        return self.chat_app
+
+    async def _build(self):
+        start = time.perf_counter()
+        # Deferred so importing the app doesn't load LangChain, LangGraph or Gemini.
+        # The imports run on a worker thread so they don't stall the event loop.
+        await asyncio.to_thread(importlib.import_module, "utils.workflow")
+        from utils.checkpoint_maintenance import CheckpointMaintainer
+        from utils.checkpointer import PooledAsyncSqliteSaver, build_checkpointer
+        from utils.holds import HoldReaper
+        from utils.indexes import ensure_indexes
+        from utils.outbox import outbox
+        from utils.workflow import get_app, get_llm, portfolio_cache
+
+        await db.connect()
+        await ensure_indexes(db.get_database())
+        self.checkpointer = await build_checkpointer(self.checkpoint_path)
+        chat_app = await get_app(self.checkpointer)
+        # Build the model client now rather than inside the first agent step
+        get_llm()
+
+        # Retention, pragmas and compaction for the checkpoint file
+        if isinstance(self.checkpointer, PooledAsyncSqliteSaver):
+            self.maintainer = CheckpointMaintainer.from_env(
+                self.checkpointer, self.checkpoint_path
+            )
+            await self.maintainer.configure()
+            self.maintainer.start()
+        self.portfolio_cache = portfolio_cache
+        portfolio_cache.start()
+        outbox.start()
+        self.hold_reaper = HoldReaper.from_env()
+        self.hold_reaper.start()
+        self._register_collectors()
+
+        self.chat_app = chat_app
+        self.build_seconds = time.perf_counter() - start
+        logging.info(f"✅ Chat runtime ready in {self.build_seconds:.2f}s")
+
+    def _register_collectors(self):
+        # Components that keep their own stats are read at scrape time
+        metrics.add_collector(
+            "admission",
+            lambda: stats_gauges("llm_admission", admission.stats(), {"rejected": "reason"}),
+        )
+        metrics.add_collector(
+            "answer_cache", lambda: stats_gauges("answer_cache", answer_cache.stats())
+        )
+        metrics.add_collector(
+            "thread_turns", lambda: stats_gauges("thread_turns", thread_turns.stats())
+        )
+        if self.maintainer is not None:
+            metrics.add_collector(
+                "checkpoint", lambda: stats_gauges("checkpoint", self.maintainer.stats())
+            )
+
+    async def stop(self):
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+            try:
+                await self._prewarm_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._prewarm_task = None
+        if self.chat_app is not None:
+            from utils.outbox import outbox
+
+            await outbox.stop()
+            await self.hold_reaper.stop()
+            await self.portfolio_cache.stop()
+            if self.maintainer is not None:
+                await self.maintainer.stop()
+            await self.checkpointer.aclose()
+            self.chat_app = None
+            print("Database connection closed.")
+        await db.close()
@@ -1,18 +1,74 @@
 import smtplib
 import os
+from email.message import EmailMessage
 
 
-def send_email(to: str, subject: str, content: str):
-    text = f"Subject: {subject}\n\n{content}"
+class SMTPSession:
+    """
+    A single authenticated SMTP connection that is reused across messages.
+    The connection is opened lazily and re-opened if the server drops it.
+    These methods block, so async callers should run them in a worker thread.
+    """
 
-    try:
-        server = smtplib.SMTP(os.environ["SMTP_HOST"], os.environ["SMTP_PORT"])
-        server.starttls()
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str = None,
+        starttls: bool = True,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.server = None
 
-        server.login(os.environ["SMTP_USER"], os.environ["SMTP_PASS"])
+    @classmethod
+    def from_env(cls):
+        return cls(
+            host=os.environ["SMTP_HOST"],
+            port=int(os.environ["SMTP_PORT"]),
+            user=os.environ["SMTP_USER"],
+            password=os.getenv("SMTP_PASS"),
+            starttls=os.getenv("SMTP_STARTTLS", "true").lower() == "true",
+        )
 
-        server.sendmail(os.environ["SMTP_USER"], to, text)
-        server.quit()
-        return {"success": True, "message": "Email sent successfully"}
-    except Exception as e:
-        return {"success": False, "message": str(e)}
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.password:
+            server.login(self.user, self.password)
+        self.server = server
+
+    def send(self, to: str, subject: str, content: str):
+        message = EmailMessage()
+        message["From"] = self.user
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(content)
+
+        if self.server is None:
+            self._connect()
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle session, reconnect once and retry
+            self.close()
+            self._connect()
+            self.server.send_message(message)
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        self.server = None
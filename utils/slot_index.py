@@ -0,0 +1,143 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+from utils.metrics import uncounted_mongo_commands
+
+# Standard business hours (UTC) offered as meeting slots
+BUSINESS_HOURS = (10, 14, 16)
+
+
+def business_slots(start: datetime, end: datetime) -> list:
+    """Every business-hour slot in [start, end), in order."""
+    slots = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        for hour in BUSINESS_HOURS:
+            slot = day.replace(hour=hour)
+            if start <= slot < end:
+                slots.append(slot)
+        day += timedelta(days=1)
+    return slots
+
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """MongoDB hands back naive UTC datetimes, so compare everything in that form."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class SlotIndex:
+    """
+    In-memory index of booked meeting dates inside a search horizon.
+
+    The booked dates are loaded with a single range query and kept in a sorted
+    list, so availability checks and free-slot searches are bisections instead
+    of one database round trip per candidate hour. Writes update the index in
+    place, and it is reloaded after `ttl_seconds` to pick up changes made by
+    other workers. `live_filter()` returns extra query conditions that
+    restrict the index to meetings that still occupy their slot.
+    """
+
+    def __init__(
+        self,
+        collection,
+        horizon_days: int = 30,
+        ttl_seconds: float = 60,
+        live_filter=dict,
+    ):
+        self.collection = collection
+        self.horizon_days = horizon_days
+        self.ttl_seconds = ttl_seconds
+        self.live_filter = live_filter
+        self._dates = []
+        self._window_start = None
+        self._window_end = None
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Reloads every booked date in the horizon with one range query."""
+        async with self._lock:
+            now = datetime.utcnow()
+            start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            end = start + timedelta(days=self.horizon_days + 1)
+            # Serves every later lookup, not just the one that triggered the reload
+            with uncounted_mongo_commands():
+                docs = await self.collection.find(
+                    {"date": {"$gte": start, "$lt": end}, **self.live_filter()},
+                    {"date": 1, "_id": 0},
+                ).to_list()
+            self._dates = sorted(doc["date"] for doc in docs)
+            self._window_start = start
+            self._window_end = end
+            self._loaded_at = now
+
+    async def _ensure_fresh(self):
+        now = datetime.utcnow()
+        if (
+            self._loaded_at is None
+            or (now - self._loaded_at).total_seconds() > self.ttl_seconds
+            or now.date() != self._loaded_at.date()
+        ):
+            await self.refresh()
+
+    def _in_window(self, dt: datetime) -> bool:
+        return self._window_start <= dt < self._window_end
+
+    def _is_booked(self, dt: datetime) -> bool:
+        i = bisect_left(self._dates, dt)
+        return i < len(self._dates) and self._dates[i] == dt
+
+    async def is_available(self, dt: datetime) -> bool:
+        """Checks if a slot is free and not in the past."""
+        dt = to_utc_naive(dt)
+        if dt < datetime.utcnow():
+            return False
+        await self._ensure_fresh()
+        if not self._in_window(dt):
+            # Beyond the horizon, fall back to a direct lookup
+            query = {"date": dt, **self.live_filter()}
+            return await self.collection.find_one(query, {"_id": 1}) is None
+        return not self._is_booked(dt)
+
+    async def next_free(self, count: int = 3, after: datetime = None) -> list:
+        """
+        Returns up to `count` free business-hour slots, starting the day after
+        `after` (default: now). The search stops at the horizon, so a full
+        calendar returns fewer slots instead of looping forever.
+        """
+        await self._ensure_fresh()
+        after = to_utc_naive(after) if after else datetime.utcnow()
+        day = after.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        slots = []
+        while len(slots) < count and day < self._window_end:
+            lo = bisect_left(self._dates, day)
+            hi = bisect_left(self._dates, day + timedelta(days=1), lo)
+            booked = set(self._dates[lo:hi])
+            for slot in business_slots(day, day + timedelta(days=1)):
+                if slot not in booked:
+                    slots.append(slot)
+                    if len(slots) >= count:
+                        break
+            day += timedelta(days=1)
+        return slots
+
+    def add(self, dt: datetime):
+        dt = to_utc_naive(dt)
+        if self._loaded_at is not None and self._in_window(dt):
+            insort(self._dates, dt)
+
+    def discard(self, dt: datetime):
+        dt = to_utc_naive(dt)
+        if self._loaded_at is None:
+            return
+        i = bisect_left(self._dates, dt)
+        if i < len(self._dates) and self._dates[i] == dt:
+            del self._dates[i]
+
+    def move(self, old: datetime, new: datetime):
+        self.discard(old)
+        self.add(new)
@@ -0,0 +1,228 @@
+from collections import OrderedDict, deque
+import asyncio
+import logging
+import os
+import time
+import uuid
+from contextlib import aclosing
+
+
+class ThreadBusy(Exception):
+    """Raised when a thread already has `max_queued` turns waiting."""
+
+
+class Turn:
+    """
+    One chat turn for a thread, fanned out to every request that asked for it.
+
+    The run publishes its SSE frames here, each tagged with an event id of
+    the form "<turn id>.<index>". Subscribers read them from any index, so a
+    duplicate that joins late still receives the whole answer and a client
+    that reconnects with Last-Event-ID picks up right after its last event.
+    """
+
+    def __init__(self, thread_id: str, key: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.key = key
+        self.frames = []
+        self.done = False
+        self.subscribers = 0
+        self.task = None
+        self._cancel_handle = None
+        self._updated = asyncio.Event()
+
+    def publish(self, frame: str):
+        self.frames.append(f"id: {self.id}.{len(self.frames)}\n{frame}")
+        self._wake()
+
+    def finish(self):
+        self.done = True
+        self._wake()
+
+    def _wake(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait(self, seen: int, timeout: float):
+        """Waits until there are more than `seen` frames or the turn is done."""
+        if seen < len(self.frames) or self.done:
+            return
+        try:
+            await asyncio.wait_for(self._updated.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class _ThreadState:
+    def __init__(self, resume_turns: int):
+        self.lock = asyncio.Lock()
+        # Queued and running turns by message, for coalescing duplicates
+        self.turns = {}
+        # Ring buffer of the latest turns, finished or not, for resuming streams
+        self.recent = deque(maxlen=resume_turns)
+        self.idle_since = None
+
+
+class ThreadCoordinator:
+    """
+    Runs at most one turn per thread_id at a time.
+
+    A turn for a thread that is already busy waits for the running one, so
+    two turns never load and checkpoint the same thread concurrently. A
+    message identical to a turn that is queued or running for the same
+    thread (a double submit, retry or reconnect) joins that turn as another
+    subscriber instead of starting a second graph run.
+
+    The last `resume_turns` turns of a thread are kept so a dropped stream can
+    be resumed from its Last-Event-ID. A turn is cancelled `resume_grace`
+    seconds after its last subscriber leaves unless someone resumes it. Idle
+    threads are forgotten after `resume_ttl` seconds, and at most
+    `max_threads` are kept, so memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        max_queued: int = 3,
+        resume_turns: int = 2,
+        resume_grace: float = 10,
+        resume_ttl: float = 60,
+        max_threads: int = 1000,
+    ):
+        self.max_queued = max_queued
+        self.resume_turns = resume_turns
+        self.resume_grace = resume_grace
+        self.resume_ttl = resume_ttl
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self._last_sweep = 0.0
+        self.started = 0
+        self.coalesced = 0
+        self.serialized = 0
+        self.rejected = 0
+        self.resumed = 0
+        self.resume_misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_queued=int(os.getenv("THREAD_MAX_QUEUED_TURNS", "3")),
+            resume_turns=int(os.getenv("RESUME_TURNS", "2")),
+            resume_grace=float(os.getenv("RESUME_GRACE_SECONDS", "10")),
+            resume_ttl=float(os.getenv("RESUME_TTL_SECONDS", "60")),
+            max_threads=int(os.getenv("RESUME_MAX_THREADS", "1000")),
+        )
+
+    def _state(self, thread_id: str):
+        self._evict()
+        state = self._threads.get(thread_id)
+        if state is not None:
+            self._threads.move_to_end(thread_id)
+        return state
+
+    def _evict(self):
+        # At most once a second; threads are kept in activity order, oldest first
+        now = time.monotonic()
+        if now - self._last_sweep < 1 and len(self._threads) <= self.max_threads:
+            return
+        self._last_sweep = now
+        excess = len(self._threads) - self.max_threads
+        for thread_id, state in list(self._threads.items()):
+            if state.turns:
+                continue
+            if excess <= 0 and now - state.idle_since <= self.resume_ttl:
+                break
+            del self._threads[thread_id]
+            excess -= 1
+
+    def join(self, thread_id: str, message: str, run_turn) -> Turn:
+        """
+        Returns the turn that answers `message` on `thread_id`, starting it if
+        there is none. `run_turn()` returns an async generator of SSE frames.
+        Call `leave(turn)` when the subscriber is done.
+        """
+        state = self._state(thread_id)
+        if state is None:
+            state = self._threads[thread_id] = _ThreadState(self.resume_turns)
+        key = message.strip()
+        turn = state.turns.get(key)
+        if turn is not None:
+            self.coalesced += 1
+            logging.info(f"🔗 Joined the in-flight turn for thread {thread_id}")
+        else:
+            if len(state.turns) > self.max_queued:
+                self.rejected += 1
+                raise ThreadBusy(thread_id)
+            turn = state.turns[key] = Turn(thread_id, key)
+            state.recent.append(turn)
+            state.idle_since = None
+            turn.task = asyncio.create_task(self._run(state, turn, run_turn))
+            self.started += 1
+        self._subscribe(turn)
+        return turn
+
+    def resume(self, thread_id: str, last_event_id: str):
+        """
+        Returns (turn, index of the first frame to send) for a client that
+        last saw `last_event_id`, or None if that turn is no longer kept.
+        """
+        turn_id, _, index = last_event_id.partition(".")
+        state = self._state(thread_id)
+        turn = next((t for t in state.recent if t.id == turn_id), None) if state else None
+        if turn is None or not index.isdigit():
+            self.resume_misses += 1
+            return None
+        self.resumed += 1
+        self._subscribe(turn)
+        return turn, int(index) + 1
+
+    def _subscribe(self, turn: Turn):
+        turn.subscribers += 1
+        if turn._cancel_handle is not None:
+            turn._cancel_handle.cancel()
+            turn._cancel_handle = None
+
+    def leave(self, turn: Turn):
+        turn.subscribers -= 1
+        if turn.subscribers == 0 and not turn.done:
+            # Nobody is listening any more; stop paying for the run unless the client reconnects
+            loop = asyncio.get_running_loop()
+            turn._cancel_handle = loop.call_later(self.resume_grace, turn.task.cancel)
+
+    async def _run(self, state: _ThreadState, turn: Turn, run_turn):
+        try:
+            if state.lock.locked():
+                self.serialized += 1
+            async with state.lock:
+                async with aclosing(run_turn()) as frames:
+                    async for frame in frames:
+                        turn.publish(frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"❌ Turn for thread {turn.thread_id} failed: {e}")
+        finally:
+            turn.finish()
+            if state.turns.get(turn.key) is turn:
+                del state.turns[turn.key]
+            if not state.turns:
+                state.idle_since = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "threads": len(self._threads),
+            "pending_turns": sum(len(s.turns) for s in self._threads.values()),
+            "buffered_frames": sum(
+                len(t.frames) for s in self._threads.values() for t in s.recent
+            ),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "serialized": self.serialized,
+            "rejected": self.rejected,
+            "resumed": self.resumed,
+            "resume_misses": self.resume_misses,
+        }
+
+
+# Global coordinator for the chat stream
+thread_turns = ThreadCoordinator.from_env()
@@ -0,0 +1,253 @@
+from langchain.tools import tool
+from pydantic import BaseModel, Field
+from datetime import datetime, timedelta
+import re
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+MONTHS = [
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+]
+# Loose parts of the day map onto the business-hour slots (UTC)
+DAY_PARTS = {"morning": 10, "noon": 12, "afternoon": 14, "evening": 16, "midnight": 0}
+
+# Full names and the usual abbreviations ("oct", "sept", "tues")
+_MONTH = (
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+_WEEKDAY = (
+    r"mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?"
+    r"|fri(?:day)?|sat(?:urday)?|sun(?:day)?"
+)
+_ORDINAL = r"(?:st|nd|rd|th)"
+
+_TIME_RE = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|(?<!\d)(\d{1,2}):(\d{2})(?::\d{2})?(?!\d)"
+)
+_DAY_PART_RE = re.compile(r"\b(%s)\b" % "|".join(DAY_PARTS))
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})(?!\d)")
+# Minute and hour offsets are exact times; day and week offsets only give the date
+_IN_TIME_RE = re.compile(r"\bin\s+(\d+)\s+(minute|hour)s?\b")
+_IN_DAYS_RE = re.compile(r"\bin\s+(\d+)\s+(day|week)s?\b")
+_MONTH_DAY_RE = re.compile(
+    rf"\b(?:(\d{{1,2}}){_ORDINAL}?(?:\s+of)?\s+({_MONTH})\.?|({_MONTH})\.?\s+(\d{{1,2}}){_ORDINAL}?)"
+    rf"(?:,?\s+(\d{{4}}))?\b"
+)
+# "on the 20th": a day of this month, or of next month once it has passed
+_DAY_OF_MONTH_RE = re.compile(rf"\b(?:the\s+)?(\d{{1,2}}){_ORDINAL}\b")
+_RELATIVE_DAY_RE = re.compile(r"\b(day after tomorrow|tomorrow|today|tonight)\b")
+_WEEKDAY_RE = re.compile(rf"\b(?:(next|this|on)\s+)?({_WEEKDAY})\b")
+_NEXT_WEEK_RE = re.compile(r"\bnext week\b")
+# Slots are in UTC, so any zone in the wording would be silently ignored
+_TIMEZONE_RE = re.compile(
+    r"\b(?:utc|gmt)(?:\s*[+-]\s*\d{1,2}(?::?\d{2})?)?(?!\w)"
+    r"|\b(?:[ecmp][sd]t|ak[sd]t|hst|ist|bst|ces?t|ees?t|wet|aest|aedt|jst|sgt|hkt)\b"
+    r"|\b(?:pacific|eastern|central|mountain)\b|\b(?:my|your|local)\s+time\b|\btime\s*zone\b"
+)
+# Date or time wording that is still left once the parts above are taken out
+_UNPARSED_RE = re.compile(
+    rf"[^\s\d]*\d\S*|\b(?:{_MONTH}|{_WEEKDAY}|week|weekend|month|year|days|weeks|months|years)\b"
+)
+
+
+class TimeNeeded(ValueError):
+    """Raised when the date is clear but the wording has no usable time."""
+
+    def __init__(self, date: datetime, expression: str):
+        super().__init__(
+            f"'{expression}' gives a date ({date.strftime('%A %Y-%m-%d')}) but no clear "
+            "time. Ask the user which time they'd like, e.g. 10am or 2pm."
+        )
+        self.date = date
+
+
+def utcnow() -> datetime:
+    """The server clock. Kept as a function so callers and tests can freeze it."""
+    return datetime.utcnow()
+
+
+def _month(name: str) -> int:
+    return [m[:3] for m in MONTHS].index(name[:3]) + 1
+
+
+def _parse_time(text: str):
+    """Returns ((hour, minute), span of the match) or None."""
+    match = _TIME_RE.search(text)
+    if match:
+        if match.group(3):
+            hour, minute = int(match.group(1)), int(match.group(2) or 0)
+            if not 1 <= hour <= 12:
+                raise ValueError(f"Invalid hour in '{match.group(0)}'")
+            hour = hour % 12 + (12 if match.group(3) == "pm" else 0)
+        else:
+            hour, minute = int(match.group(4)), int(match.group(5))
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time '{match.group(0)}'")
+        return (hour, minute), match.span()
+    match = _DAY_PART_RE.search(text)
+    if match:
+        return (DAY_PARTS[match.group(1)], 0), match.span()
+    return None
+
+
+def _parse_date(text: str, now: datetime):
+    """Returns (date at midnight, span of the match) or None."""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    match = _ISO_DATE_RE.search(text)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+        return today.replace(year=year, month=month, day=day), match.span()
+
+    match = _MONTH_DAY_RE.search(text)
+    if match:
+        day = int(match.group(1) or match.group(4))
+        month = _month(match.group(2) or match.group(3))
+        year = int(match.group(5)) if match.group(5) else now.year
+        date = today.replace(year=year, month=month, day=day)
+        if date < today and not match.group(5):
+            # "August 3" in September means next year's August 3
+            date = date.replace(year=year + 1)
+        return date, match.span()
+
+    match = _DAY_OF_MONTH_RE.search(text)
+    if match:
+        date = today.replace(day=int(match.group(1)))
+        if date < today:
+            month = today.replace(day=1) + timedelta(days=32)
+            date = month.replace(day=int(match.group(1)))
+        return date, match.span()
+
+    match = _IN_DAYS_RE.search(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        return today + timedelta(**{unit + "s": amount}), match.span()
+
+    match = _RELATIVE_DAY_RE.search(text)
+    if match:
+        offset = {"day after tomorrow": 2, "tomorrow": 1}.get(match.group(1), 0)
+        return today + timedelta(days=offset), match.span()
+
+    match = _WEEKDAY_RE.search(text)
+    if match:
+        qualifier, name = match.groups()
+        weekday = [d[:3] for d in WEEKDAYS].index(name[:3])
+        days_ahead = (weekday - today.weekday()) % 7
+        if days_ahead == 0 and qualifier == "next":
+            days_ahead = 7
+        return today + timedelta(days=days_ahead), match.span()
+
+    match = _NEXT_WEEK_RE.search(text)
+    if match:
+        return today + timedelta(days=7), match.span()
+    return None
+
+
+def _check_fully_parsed(expression: str, text: str, spans: list):
+    """Raises ValueError when date or time wording is left outside the parsed spans."""
+    # Anything date-like that wasn't parsed would otherwise be silently dropped
+    rest = text
+    for start, end in spans:
+        rest = rest[:start] + " " * (end - start) + rest[end:]
+    unparsed = _UNPARSED_RE.search(rest) or _DAY_PART_RE.search(rest)
+    if unparsed:
+        raise ValueError(
+            f"Could not understand the date/time '{expression}' (near '{unparsed.group(0)}')"
+        )
+
+
+def resolve_datetime(expression: str, now: datetime = None) -> datetime:
+    """
+    Resolves a natural-language date/time expression such as "tomorrow 3pm",
+    "next Friday at 10:30", "Oct 20 2pm", "in 2 days at 3pm" or "in 2 hours"
+    against `now` (UTC). Raises TimeNeeded when only the date is clear, and
+    ValueError when any part of the expression can't be understood or names a
+    time zone, rather than guessing.
+    """
+    now = now or utcnow()
+    text = expression.strip().lower()
+    if text in ("", "now", "right now"):
+        return now.replace(microsecond=0)
+
+    zone = _TIMEZONE_RE.search(text)
+    if zone:
+        raise ValueError(
+            f"'{expression}' names a time zone ('{zone.group(0)}'), but all times here are "
+            "UTC. Convert the time to UTC and pass it without a zone, or ask the user to."
+        )
+
+    match = _IN_TIME_RE.search(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        _check_fully_parsed(expression, text, [match.span()])
+        return (now + timedelta(**{unit + "s": amount})).replace(microsecond=0)
+
+    date = _parse_date(text, now)
+    time = _parse_time(text)
+    if date is None and time is None:
+        raise ValueError(f"Could not understand the date/time '{expression}'")
+    if time is None:
+        raise TimeNeeded(date[0], expression)
+    _check_fully_parsed(expression, text, [span for _, span in filter(None, (date, time))])
+
+    (hour, minute), _ = time
+    if date is None:
+        # A bare time means the next occurrence of that time
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if (hour, minute) <= (now.hour, now.minute):
+            day += timedelta(days=1)
+    else:
+        day = date[0]
+    return day.replace(hour=hour, minute=minute)
+
+
+class ResolveDatetimeSchema(BaseModel):
+    expression: str = Field(
+        default="now",
+        description="The user's date/time wording, e.g. 'tomorrow 3pm', 'next Friday at 10am', 'Oct 15 2pm' or 'now'.",
+    )
+
+
+@tool("resolve_datetime", args_schema=ResolveDatetimeSchema)
+def resolve_datetime_tool(expression: str = "now"):
+    """
+    Returns the current UTC time and converts the user's date/time wording into a
+    strict ISO 8601 string that can be passed to check_slot_availability.
+    """
+    now = utcnow()
+    result = {
+        "current_utc": now.replace(microsecond=0).isoformat(),
+        "current_weekday": now.strftime("%A"),
+    }
+    try:
+        resolved = resolve_datetime(expression, now)
+    except TimeNeeded as e:
+        result["needs_time"] = True
+        result["date"] = e.date.date().isoformat()
+        result["error"] = str(e)
+        return result
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+    result["datetime_str"] = resolved.isoformat()
+    result["weekday"] = resolved.strftime("%A")
+    return result
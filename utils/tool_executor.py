@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+import asyncio
+import contextvars
+import functools
+import os
+import time
+
+from utils.metrics import tool_duration, tracer
+
+
+def _is_async(tool: BaseTool) -> bool:
+    if isinstance(tool, StructuredTool):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+
+class ToolExecutor:
+    """
+    Graph node that runs every tool call of the last AI message concurrently.
+
+    Async tools are awaited on the event loop. Sync tools run in a bounded
+    thread pool so blocking I/O never stalls other streams. A semaphore caps
+    how many tools run at once, each call has a timeout (overridable per
+    tool), and the latency and outcome of every call go to the tool_duration
+    histogram.
+    """
+
+    def __init__(
+        self,
+        tools: list,
+        max_concurrency: int = 8,
+        max_threads: int = 8,
+        default_timeout: float = 30,
+        timeouts: dict = None,
+    ):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="tool"
+        )
+
+    @classmethod
+    def from_env(cls, tools: list, timeouts: dict = None):
+        return cls(
+            tools,
+            max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", "8")),
+            max_threads=int(os.getenv("TOOL_THREAD_POOL_SIZE", "8")),
+            default_timeout=float(os.getenv("TOOL_TIMEOUT_SECONDS", "30")),
+            timeouts=timeouts,
+        )
+
+    async def __call__(self, state, config: RunnableConfig):
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+            return {"messages": []}
+        results = await asyncio.gather(
+            *(self._run(call, config) for call in last_message.tool_calls)
+        )
+        return {"messages": list(results)}
+
+    async def run_call(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        """Runs a single tool call made outside the tools node (e.g. by the fast path router)."""
+        return await self._run(call, config)
+
+    async def _run(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        # Read-only results are reused within the run when the caller provides a memo
+        memo = config.get("configurable", {}).get("tool_memo")
+        if memo is None:
+            return await self._execute(call, config)
+        return await memo.run(call, lambda c: self._execute(c, config))
+
+    async def _execute(self, call: dict, config: RunnableConfig) -> ToolMessage:
+        name = call["name"]
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return self._error(call, f"Error: {name} is not a valid tool.")
+
+        timeout = self.timeouts.get(name, self.default_timeout)
+        tool_call = {**call, "type": "tool_call"}
+        async with self._semaphore:
+            start = time.perf_counter()
+            status = "error"
+            try:
+                if _is_async(tool):
+                    invocation = tool.ainvoke(tool_call, config)
+                else:
+                    # Copy the context so callbacks and tracing still see this run
+                    context = contextvars.copy_context()
+                    invocation = asyncio.get_running_loop().run_in_executor(
+                        self._pool,
+                        functools.partial(context.run, tool.invoke, tool_call, config),
+                    )
+                with tracer.span(f"tool.{name}", config):
+                    result = await asyncio.wait_for(invocation, timeout=timeout)
+                status = "ok"
+                return result
+            except asyncio.TimeoutError:
+                status = "timeout"
+                return self._error(call, f"Error: {name} timed out after {timeout}s.")
+            except Exception as e:
+                return self._error(call, f"Error: {repr(e)}\n Please fix your mistakes.")
+            finally:
+                tool_duration.observe(time.perf_counter() - start, tool=name, status=status)
+
+    def _error(self, call: dict, content: str) -> ToolMessage:
+        return ToolMessage(
+            content=content, name=call["name"], tool_call_id=call["id"], status="error"
+        )
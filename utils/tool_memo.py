@@ -0,0 +1,60 @@
+from langchain_core.messages import ToolMessage
+import json
+
+from utils.metrics import count_mongo_commands, tool_memo_hits
+
+# Read-only tools whose results can be reused for the rest of a run
+MEMO_TOOLS = frozenset({"lookup_client", "check_slot_availability"})
+# Tools that change meetings, so cached lookups may be stale after them
+WRITE_TOOLS = frozenset({"book_meeting", "verify_meeting", "reschedule", "decline_meeting"})
+
+
+class ToolMemo:
+    """
+    Per-run cache of read-only tool results, keyed on tool name and arguments.
+
+    The chat controller puts one in `config["configurable"]["tool_memo"]`, so
+    it lives exactly as long as one graph run and is never shared between
+    threads. A write tool drops the cached client lookups for its email and
+    every slot check, since booking or moving a meeting changes both. Each
+    cached entry remembers how many MongoDB commands the tool itself issued,
+    so hits report the database calls they saved. Shared work such as a slot
+    index reload is not counted, since a repeat call wouldn't redo it.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self.hits = 0
+        self.saved_db_calls = 0
+
+    async def run(self, call: dict, execute) -> ToolMessage:
+        """Answers `call` from the memo, or runs `execute(call)` and remembers the result."""
+        name, args = call["name"], call.get("args", {})
+        if name not in MEMO_TOOLS:
+            message = await execute(call)
+            if name in WRITE_TOOLS:
+                self.invalidate(args)
+            return message
+
+        key = (name, json.dumps(args, sort_keys=True, default=str))
+        cached = self._results.get(key)
+        if cached is not None:
+            content, db_calls = cached
+            self.hits += 1
+            self.saved_db_calls += db_calls
+            tool_memo_hits.inc(tool=name)
+            return ToolMessage(content=content, name=name, tool_call_id=call["id"])
+
+        with count_mongo_commands() as db_calls:
+            message = await execute(call)
+        if message.status != "error":
+            self._results[key] = (message.content, db_calls[0])
+        return message
+
+    def invalidate(self, args: dict):
+        email = args.get("client_email")
+        for key in list(self._results):
+            name, cached_args = key
+            # Slot checks are keyed on a time, not a client, so any write may affect them
+            if name == "check_slot_availability" or json.loads(cached_args).get("client_email") == email:
+                del self._results[key]
@@ -2,25 +2,32 @@ import os
 from typing import TypedDict, Annotated
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, START, END, add_messages
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.prebuilt import ToolNode
-from langchain_tavily import TavilySearch
-import aiosqlite  # Use the async version of sqlite
-
-from utils.database_operations import find_portfolio_data
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+
+from utils.portfolio import PortfolioCache
+from utils.project_index import (
+    ProjectIndex,
+    format_relevant_projects,
+    portfolio_summary,
+)
+from utils.tool_executor import ToolExecutor
+from utils.fast_paths import FastPathRouter, route_after_fast_path
+from utils.metrics import timed_node
+from utils.context_window import (
+    compact_history,
+    extract_booking_facts,
+    format_booking_facts,
+)
 from utils.meeting_tools import (
     check_slot_availability,
     book_meeting_tool,
     verify_meeting_tool,
     decline_meeting_tool,
-    get_client_details_tool,
-    is_user_exist_tool,
+    lookup_client_tool,
     reschedule_tool,
 )
-from utils.validate_email import validate_email_tool
+from utils.time_tools import resolve_datetime_tool
 
 load_dotenv()
 
@@ -33,59 +40,60 @@ class AgentState(TypedDict):
 
 
 # ✅ --- Tools and LLM ---
-search_tool = TavilySearch(max_results=1)
-tools = [
-    check_slot_availability,
-    book_meeting_tool,
-    verify_meeting_tool,
-    decline_meeting_tool,
-    validate_email_tool,
-    search_tool,
-    get_client_details_tool,
-    is_user_exist_tool,
-    reschedule_tool,
-]
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.5).bind_tools(
-    tools=tools
-)
+# The Gemini and Tavily clients (and their imports) are built on first use
+llm = None
+_tools = None
+
+
+def get_tools() -> list:
+    global _tools
+    if _tools is None:
+        from langchain_tavily import TavilySearch
+
+        search_tool = TavilySearch(max_results=1)
+        _tools = [
+            resolve_datetime_tool,
+            check_slot_availability,
+            book_meeting_tool,
+            verify_meeting_tool,
+            decline_meeting_tool,
+            lookup_client_tool,
+            search_tool,
+            reschedule_tool,
+        ]
+    return _tools
+
+
+def get_llm():
+    global llm
+    if llm is None:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0.5).bind_tools(
+            tools=get_tools()
+        )
+    return llm
 
 
 # ✅ --- System Prompt Definition ---
-def get_system_prompt():
-    user, projects, meetings = find_portfolio_data()
+def get_system_prompt(user, projects):
     if not user and not projects:
         print("⚠️ WARNING: No user or project data found in the database.")
 
     user_context = "No user data found in the database."
     if user:
-        # Get the list of stack objects, or an empty list if it doesn't exist
-        stack_list = user.get("stack", [])
-
-        # Use a list comprehension to pull the 'description' string from each object
-        stack_descriptions = [item.get("description", "N/A") for item in stack_list]
-
-        # Now, join the list of strings
-        stack_str = ", ".join(stack_descriptions)
-
         # Build the final context string
-        user_context = f"Name: {user.get('name', 'N/A')}\nTitle: {user.get('title', 'N/A')}\nDescription: {user.get('description', 'N/A')}\nStack: {stack_str}"
-
-    projects_context = "No projects found in the database."
-    if projects:
-        projects_context = "\n".join(
-            [
-                f"- {p.get('title', 'Untitled')}: {p.get('description', 'No description')}"
-                for p in projects
-            ]
-        )
+        user_context = f"Name: {user.get('name', 'N/A')}\nTitle: {user.get('title', 'N/A')}\nDescription: {user.get('description', 'N/A')}"
 
-    full_context = f"USER DATA:\n{user_context}\n\nPROJECTS:\n{projects_context}"
+    # Only a fixed-size summary lives here; the projects and stack entries that
+    # match the conversation are appended to the prompt on every turn
+    full_context = f"USER DATA:\n{user_context}\n\nPORTFOLIO:\n{portfolio_summary(user, projects)}"
 
     return f"""
 You are Aryan Baghel's specialized assistant. Your persona is professional, friendly, and highly conversational. You are an intelligent aide, not a robot.
 
 **Your Knowledge Base:**
-You must base your answers on the following context. If information is missing, politely state that you don't have that detail.
+You must base your answers on the following context and on the relevant portfolio entries listed at the end of this prompt. If information is missing, politely state that you don't have that detail.
 {full_context}
 
 ---
@@ -101,9 +109,9 @@ You must base your answers on the following context. If information is missing,
 **Step 1: Smart Onboarding**
 When a user wants to book or reschedule, you MUST follow this sequence precisely:
 - **A. First, ask for their email address.**
-- **B. Once you receive the email, you MUST first call `validate_email_tool` to ensure the format is correct.**
-- **C. Only after the email is validated**, you MUST then immediately call `is_user_exist_tool`.
-- **If user exists (`is_user_exist_tool` returns success):** Call `get_client_details_tool` to get their name. Greet them warmly by name (e.g., "Welcome back, [User's Name]!"). Then, ask if they want to book a NEW meeting or RESCHEDULE their existing one.
+- **B. Once you receive the email, you MUST call `lookup_client_tool` exactly once.** It validates the email and looks up the client in a single step.
+- **If the email is not valid (`valid_email` is false):** Politely ask them to check and re-enter their email.
+- **If user exists (`exists` is true):** Use the returned `client` details to greet them warmly by name (e.g., "Welcome back, [User's Name]!"). Then, ask if they want to book a NEW meeting or RESCHEDULE their existing one.
 - **If user does not exist:** Proceed to the standard booking flow by asking for their full name.
 
 **Step 2: Standard Booking Flow (for New Users)**
@@ -111,17 +119,19 @@ When a user wants to book or reschedule, you MUST follow this sequence precisely
 
 **Step 3: Finding a Time (for Booking or Rescheduling)**
 - Ask the user for their preferred time.
-- **Internal Process:** Use `TavilySearch` for the current time, then call `check_slot_availability` with the converted ISO string.
+- **Internal Process:** Call `resolve_datetime_tool` with the user's wording (e.g. "tomorrow 3pm") to get the exact ISO time, then call `check_slot_availability` with that `datetime_str`. Never use a web search to find the current time. If it returns `needs_time` or an `error`, ask the user for the missing or unclear part instead of guessing.
 - **Communicate Availability:** If the slot is open, you MUST ask for permission to proceed. **CRITICAL:** Your response MUST be a question like, "Good news! That time is available. Shall I go ahead and book it for you?" and then you MUST STOP and wait for their reply.
 
 **Step 4: The Booking/Rescheduling Action**
 - **CRITICAL:** Only after the user explicitly agrees (e.g., "Yes, please do"), you will call the appropriate tool:
     - For new meetings, call `book_meeting_tool`.
     - For rescheduling, call `reschedule_tool`.
+- **If a tool returns `status: "slot_taken"`:** Someone else got that slot first. Apologize briefly, offer the returned `suggestions`, and after the user picks one, book or reschedule again (a new booking sends a new code).
 
 **Step 5: The OTP Verification (for New Bookings Only)**
 - After `book_meeting_tool` is called, announce that a verification code has been sent.
 - The next user message is the OTP. Your sole focus is to call `verify_meeting_tool`.
+- If the result is `invalid_otp`, ask them to re-check the code. If it is `expired` or `too_many_attempts`, the slot was released: offer to book again (a new code will be sent).
 
 **Step 6: Post-Confirmation Behavior**
 - After a successful `verify_meeting` or `reschedule_tool` call, the process is COMPLETE.
@@ -130,23 +140,56 @@ When a user wants to book or reschedule, you MUST follow this sequence precisely
 """
 
 
+# Per-tool timeouts (seconds), everything else uses TOOL_TIMEOUT_SECONDS
+TOOL_TIMEOUTS = {
+    "tavily_search": 15,
+    "lookup_client": 10,
+    "resolve_datetime": 5,
+}
+
+
+# ✅ --- Context Window ---
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+
+
+# ✅ --- Portfolio Context Cache ---
+portfolio_cache = PortfolioCache(
+    render=get_system_prompt,
+    build_index=ProjectIndex.from_portfolio,
+    ttl_seconds=float(os.getenv("PORTFOLIO_TTL_SECONDS", "300")),
+)
+
+
+# ✅ --- Project Retrieval ---
+def _retrieval_query(messages: list, turns: int = 2) -> str:
+    """The latest user messages, so a follow-up like "what stack did it use?" keeps its subject."""
+    recent = [m.content for m in messages if isinstance(m, HumanMessage)][-turns:]
+    return " ".join(c for c in recent if isinstance(c, str))
+
+
 # --- Graph Definition ---
 def build_graph():
-    agent_system_prompt = get_system_prompt()
-    agent_system_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", agent_system_prompt),
-            MessagesPlaceholder(variable_name="messages"),
-        ]
-    )
-    agent = agent_system_template | llm
-
-    async def agent_node(state: AgentState):
+    async def agent_node(state: AgentState, config: RunnableConfig):
+        # Requests pin a snapshot up front so every agent step in a run sees the same prompt
+        snapshot = config.get("configurable", {}).get("portfolio")
+        if snapshot is None:
+            snapshot = await portfolio_cache.get()
+        # Keep the history inside the token budget, but never lose the booking facts
+        facts = extract_booking_facts(state["messages"])
+        history, saved = compact_history(state["messages"], CONTEXT_TOKEN_BUDGET)
+        if saved:
+            print(f"✂️ Context window trimmed, saved ~{saved} tokens this turn")
+        relevant = snapshot.index.search(_retrieval_query(state["messages"]))
+        system_prompt = (
+            snapshot.prompt + format_relevant_projects(relevant) + format_booking_facts(facts)
+        )
+        messages = [SystemMessage(content=system_prompt), *history]
         # Use .ainvoke() for async tool calls
-        result = await agent.ainvoke(state)
+        result = await get_llm().ainvoke(messages)
         return {"messages": [result]}
 
-    tool_node = ToolNode(tools=tools)
+    # Runs the turn's tool calls concurrently, sync tools on a bounded thread pool
+    tool_node = ToolExecutor.from_env(get_tools(), timeouts=TOOL_TIMEOUTS)
 
     def should_continue(state: AgentState):
         last_message = state["messages"][-1]
@@ -154,10 +197,18 @@ def build_graph():
             return "tools"
         return END
 
+    # Answers deterministic turns (like a bare OTP) without a model call
+    fast_path = FastPathRouter(tool_node)
+
     graph = StateGraph(AgentState)
-    graph.add_node("agent", agent_node)
-    graph.add_node("tools", tool_node)
-    graph.set_entry_point("agent")
+    # Node durations are recorded for /metrics and traced per thread
+    graph.add_node("fast_path", timed_node("fast_path", fast_path))
+    graph.add_node("agent", timed_node("agent", agent_node))
+    graph.add_node("tools", timed_node("tools", tool_node))
+    graph.set_entry_point("fast_path")
+    graph.add_conditional_edges(
+        "fast_path", route_after_fast_path, {"agent": "agent", "end": END}
+    )
     graph.add_conditional_edges("agent", should_continue, {"tools": "tools", END: END})
     graph.add_edge("tools", "agent")
     return graph
@@ -165,9 +216,9 @@ def build_graph():
 
 # --- ASYNC INITIALIZATION FUNCTION ---
 # This function will be called from our async controller to create the app instance.
-async def get_app(conn: aiosqlite.Connection):
-    checkpointer = AsyncSqliteSaver(conn=conn)
-
+async def get_app(checkpointer):
+    # Load the portfolio once up front so the first request doesn't pay for it
+    await portfolio_cache.refresh()
     graph = build_graph()
 
     # Compile the graph with the async checkpointer